@@ -0,0 +1,79 @@
+"""
+首张图片耗时基准测试
+
+比较完整转换（pdf_to_images）与渐进式预览（progressive_pdf_to_images）从调用开始到
+第一张图片写出的耗时（time-to-first-image），以及全部图片完成的总耗时。
+
+用法:
+    uv run benchmarks/bench_first_image.py document.pdf
+    uv run benchmarks/bench_first_image.py document.pdf -n 5 --dpi 300 --preview-dpi 72 --workers 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import DocumentPool, pdf_to_images, progressive_pdf_to_images  # noqa: E402
+
+
+def time_full(pdf_path, output_dir, dpi, workers):
+    """完整转换：返回 (首张图片耗时, 总耗时)"""
+    first = None
+    start = time.perf_counter()
+
+    def on_event(event):
+        nonlocal first
+        if first is None and event["event"] == "page" and event["status"] == "ok":
+            first = time.perf_counter() - start
+
+    pdf_to_images(pdf_path, output_dir, dpi=dpi, log_callback=lambda message: None,
+                  workers=workers, pool=DocumentPool(), event_callback=on_event)
+    return first, time.perf_counter() - start
+
+
+def time_progressive(pdf_path, output_dir, dpi, preview_dpi):
+    """渐进式预览：返回 (首张图片耗时, 总耗时)"""
+    start = time.perf_counter()
+    conversion = progressive_pdf_to_images(pdf_path, output_dir, dpi=dpi, preview_dpi=preview_dpi,
+                                           log_callback=lambda message: None, pool=DocumentPool())
+    conversion.wait()
+    return conversion.first_image_seconds, time.perf_counter() - start
+
+
+def report(label, timings):
+    firsts = [first for first, _ in timings]
+    totals = [total for _, total in timings]
+    print(
+        f"{label:<16} 首张图片 中位数 {statistics.median(firsts) * 1000:8.1f} ms   "
+        f"全部完成 中位数 {statistics.median(totals) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="首张图片耗时基准测试")
+    parser.add_argument("pdf_path", help="测试用PDF文件")
+    parser.add_argument("-n", "--runs", type=int, default=3, help="每项运行次数")
+    parser.add_argument("-d", "--dpi", type=int, default=200, help="正式图片DPI")
+    parser.add_argument("--preview-dpi", type=int, default=72, help="预览图片DPI")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="完整转换的并行进程数")
+    args = parser.parse_args()
+
+    full, progressive = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as output_dir:
+            full.append(time_full(args.pdf_path, output_dir, args.dpi, args.workers))
+        with tempfile.TemporaryDirectory() as output_dir:
+            progressive.append(time_progressive(args.pdf_path, output_dir, args.dpi, args.preview_dpi))
+
+    report("完整转换", full)
+    report("渐进式预览", progressive)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,61 @@
+"""
+CLI启动耗时基准测试
+
+反复启动命令行程序并统计耗时，用于衡量延迟导入和打包方式对启动速度的影响。
+
+用法:
+    uv run benchmarks/bench_startup.py
+    uv run benchmarks/bench_startup.py -n 50
+    uv run benchmarks/bench_startup.py --cmd dist/linux/pdf_to_image_cli_linux/pdf_to_image_cli_linux --help
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+
+def time_command(cmd, runs):
+    """运行命令 runs 次，返回每次耗时（秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<24} 中位数 {statistics.median(timings) * 1000:8.1f} ms   "
+        f"最小 {min(timings) * 1000:8.1f} ms   最大 {max(timings) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI启动耗时基准测试")
+    parser.add_argument("-n", "--runs", type=int, default=20, help="每项运行次数")
+    parser.add_argument("--cmd", nargs=argparse.REMAINDER, help="测试指定命令（例如打包后的可执行文件）")
+    args = parser.parse_args()
+    
+    if args.cmd:
+        report(" ".join(args.cmd)[:24], time_command(args.cmd, args.runs))
+        return 0
+    
+    cases = [
+        ("python 空启动", [sys.executable, "-c", "pass"]),
+        ("main.py --help", [sys.executable, MAIN, "--help"]),
+        ("main.py 参数错误", [sys.executable, MAIN, "x.pdf", "--pages", "bad"]),
+        ("import fitz + PIL", [sys.executable, "-c", "import fitz; from PIL import Image"]),
+    ]
+    for label, cmd in cases:
+        report(label, time_command(cmd, args.runs))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
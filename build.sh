@@ -5,6 +5,21 @@
 
 set -e  # 遇到错误立即退出
 
+# CLI打包模式: onefile 为单个可执行文件（每次启动都会解压到临时目录），
+# onedir 为目录形式（无需解压，启动更快，适合频繁调用的场景）
+CLI_MODE="onefile"
+
+# 返回CLI可执行文件路径（onedir 模式下位于同名子目录中）
+cli_path() {
+    local platform=$1
+    local name=$2
+    if [ "$CLI_MODE" = "onedir" ]; then
+        echo "dist/$platform/$name/$name"
+    else
+        echo "dist/$platform/$name"
+    fi
+}
+
 echo "=========================================="
 echo "PDF转图片工具 - 跨平台构建脚本"
 echo "=========================================="
@@ -69,7 +84,7 @@ build_windows() {
     
     echo "正在编译CLI版本..."
     uv run pyinstaller \
-        --onefile \
+        --$CLI_MODE \
         --console \
         --name pdf_to_image_cli_windows \
         --distpath dist/windows \
@@ -77,14 +92,16 @@ build_windows() {
         --specpath build/windows \
         main.py
     
+    local cli_exe="$(cli_path windows pdf_to_image_cli_windows).exe"
+    
     echo "Windows版本编译完成！"
     echo "GUI版本: dist/windows/pdf_to_image_gui_windows.exe"
-    echo "CLI版本: dist/windows/pdf_to_image_cli_windows.exe"
+    echo "CLI版本: $cli_exe"
     
     # 测试编译结果
-    if [ -f "dist/windows/pdf_to_image_cli_windows.exe" ]; then
+    if [ -f "$cli_exe" ]; then
         echo "正在测试编译结果..."
-        if ./dist/windows/pdf_to_image_cli_windows.exe --help > /dev/null 2>&1; then
+        if "./$cli_exe" --help > /dev/null 2>&1; then
             echo "✓ 测试成功！"
         else
             echo "⚠ 测试失败，但文件已生成"
@@ -111,7 +128,7 @@ build_linux() {
     
     echo "正在编译CLI版本..."
     uv run pyinstaller \
-        --onefile \
+        --$CLI_MODE \
         --console \
         --name pdf_to_image_cli_linux \
         --distpath dist/linux \
@@ -123,21 +140,22 @@ build_linux() {
     if [ -f "dist/linux/pdf_to_image_gui_linux.exe" ]; then
         mv "dist/linux/pdf_to_image_gui_linux.exe" "dist/linux/pdf_to_image_gui_linux"
     fi
-    if [ -f "dist/linux/pdf_to_image_cli_linux.exe" ]; then
-        mv "dist/linux/pdf_to_image_cli_linux.exe" "dist/linux/pdf_to_image_cli_linux"
+    local cli_exe="$(cli_path linux pdf_to_image_cli_linux)"
+    if [ -f "$cli_exe.exe" ]; then
+        mv "$cli_exe.exe" "$cli_exe"
     fi
     
     # 设置可执行权限
     chmod +x dist/linux/pdf_to_image_gui_linux
-    chmod +x dist/linux/pdf_to_image_cli_linux
+    chmod +x "$cli_exe"
     
     echo "Linux版本编译完成！"
     echo "GUI版本: dist/linux/pdf_to_image_gui_linux"
-    echo "CLI版本: dist/linux/pdf_to_image_cli_linux"
+    echo "CLI版本: $cli_exe"
     
     # 测试编译结果
     echo "正在测试编译结果..."
-    if ./dist/linux/pdf_to_image_cli_linux --help > /dev/null 2>&1; then
+    if "./$cli_exe" --help > /dev/null 2>&1; then
         echo "✓ 测试成功！"
     else
         echo "⚠ 测试失败，请检查编译结果"
@@ -163,7 +181,7 @@ build_macos() {
     
     echo "正在编译CLI版本..."
     uv run pyinstaller \
-        --onefile \
+        --$CLI_MODE \
         --console \
         --name pdf_to_image_cli_macos \
         --distpath dist/macos \
@@ -175,24 +193,25 @@ build_macos() {
     if [ -f "dist/macos/PDF转图片工具_macos.exe" ]; then
         mv "dist/macos/PDF转图片工具_macos.exe" "dist/macos/PDF转图片工具_macos"
     fi
-    if [ -f "dist/macos/pdf_to_image_cli_macos.exe" ]; then
-        mv "dist/macos/pdf_to_image_cli_macos.exe" "dist/macos/pdf_to_image_cli_macos"
+    local cli_exe="$(cli_path macos pdf_to_image_cli_macos)"
+    if [ -f "$cli_exe.exe" ]; then
+        mv "$cli_exe.exe" "$cli_exe"
     fi
     
     # 设置可执行权限
-    chmod +x dist/macos/pdf_to_image_cli_macos
+    chmod +x "$cli_exe"
     if [ -f "dist/macos/PDF转图片工具_macos" ]; then
         chmod +x "dist/macos/PDF转图片工具_macos"
     fi
     
     echo "macOS版本编译完成！"
     echo "GUI版本: dist/macos/PDF转图片工具_macos"
-    echo "CLI版本: dist/macos/pdf_to_image_cli_macos"
+    echo "CLI版本: $cli_exe"
     echo "注意: 首次运行可能需要在系统偏好设置中允许运行未签名的应用"
     
     # 测试编译结果
     echo "正在测试编译结果..."
-    if ./dist/macos/pdf_to_image_cli_macos --help > /dev/null 2>&1; then
+    if "./$cli_exe" --help > /dev/null 2>&1; then
         echo "✓ 测试成功！"
     else
         echo "⚠ 测试失败，请检查编译结果"
@@ -206,12 +225,14 @@ show_help() {
     echo "选项:"
     echo "  -h, --help     显示此帮助信息"
     echo "  -p, --platform 指定目标平台 (windows|linux|macos|all)"
+    echo "  --onedir       CLI以目录形式打包，启动时无需解压，适合频繁调用"
     echo "  --clean        清理dist目录"
     echo ""
     echo "示例:"
     echo "  $0              # 为当前平台编译"
     echo "  $0 -p windows   # 仅编译Windows版本"
     echo "  $0 -p all       # 编译所有平台版本"
+    echo "  $0 --onedir     # CLI以目录形式打包"
     echo "  $0 --clean      # 清理编译输出"
 }
 
@@ -242,6 +263,10 @@ main() {
                 clean_only=true
                 shift
                 ;;
+            --onedir)
+                CLI_MODE="onedir"
+                shift
+                ;;
             *)
                 echo "未知选项: $1"
                 show_help
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+分布式批量转换 - 基于SQLite的页面级任务队列
+
+协调端把PDF列表拆分为 (文档, 页码) 任务写入队列文件，多个工作进程/主机
+通过租约领取任务并转换，超时未完成的租约会被其他工作端重新领取，失败的任务
+按次数重试。每个工作端写出自己的清单(JSON Lines)，最后合并为一份清单。
+
+用法:
+    python distributed.py enqueue queue.db a.pdf b.pdf -o output --pages 1-20
+    python distributed.py work queue.db --manifest host1.jsonl
+    python distributed.py status queue.db
+    python distributed.py merge host1.jsonl host2.jsonl -o manifest.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from main import (
+    BatchReport,
+    DocumentPool,
+    _join_page_arguments,
+    open_pdf,
+    pdf_to_images,
+    quality_to_dpi,
+    select_pages,
+)
+
+
+# 队列中可以保存并传递给 pdf_to_images 的转换参数（需可JSON序列化）
+TASK_OPTIONS = ("output_format", "dpi", "width", "height", "max_pixels", "auto_dpi", "skip_blank", "ink_threshold")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    document TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    output_dir TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    updated REAL,
+    UNIQUE (document, page, output_dir)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+"""
+
+
+class PageQueue:
+    """
+    SQLite页面任务队列
+
+    任务状态: pending（待领取） / leased（已租出） / done（完成） / failed（超过重试次数）。
+    租约过期的 leased 任务视为待领取，因此崩溃的工作端不会丢失任务；已用完尝试次数的
+    过期租约（如每次都卡死或使工作端崩溃的页面）转为 failed，不再重试。
+    队列文件放在共享文件系统上即可供多台主机同时使用（要求文件系统支持文件锁）。
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, timeout: float = 30.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE 立即取得写锁，避免多个工作端领取到同一任务
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def enqueue(self, document: str, pages: List[int], output_dir: str, options: dict) -> int:
+        """
+        写入一个文档的页面任务，已存在的 (文档, 页码, 输出目录) 任务会被忽略
+
+        Args:
+            document: 文档路径（各工作端需能以同一路径访问）
+            pages: 页码列表（从1开始）
+            output_dir: 该文档的输出目录
+            options: 转换参数，键见 TASK_OPTIONS
+
+        Returns:
+            新增的任务数
+        """
+        options_json = json.dumps(options, sort_keys=True)
+        now = time.time()
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO tasks (document, page, output_dir, options, updated) VALUES (?, ?, ?, ?, ?)",
+                [(document, page, output_dir, options_json, now) for page in pages]
+            )
+            return db.total_changes - before
+
+    def lease(self, owner: str, count: int = 1, lease_seconds: float = 300.0) -> List[sqlite3.Row]:
+        """
+        领取最多 count 个任务，优先领取同一文档的任务以复用已打开的文档
+
+        Returns:
+            领取到的任务行，队列空时为空列表
+        """
+        now = time.time()
+        with self._transaction() as db:
+            self._expire(db, now)
+            rows = db.execute(
+                "SELECT id FROM tasks WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                "AND attempts < ? ORDER BY document, page LIMIT ?",
+                (now, self.max_attempts, count)
+            ).fetchall()
+            ids = [row["id"] for row in rows]
+            if not ids:
+                return []
+            marks = ",".join("?" * len(ids))
+            db.execute(
+                f"UPDATE tasks SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                f"updated = ? WHERE id IN ({marks})",
+                [owner, now + lease_seconds, now, *ids]
+            )
+            return db.execute(f"SELECT * FROM tasks WHERE id IN ({marks}) ORDER BY page", ids).fetchall()
+
+    def _expire(self, db: sqlite3.Connection, now: float):
+        """把已用完尝试次数的过期租约标记为失败"""
+        db.execute(
+            "UPDATE tasks SET status = 'failed', error = COALESCE(error, '租约过期：工作端未在租约内完成'), "
+            "lease_expires = NULL, updated = ? WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts)
+        )
+
+    def renew(self, owner: str, task_ids: List[int], lease_seconds: float = 300.0):
+        """延长仍在处理中的任务租约"""
+        if not task_ids:
+            return
+        marks = ",".join("?" * len(task_ids))
+        with self._transaction() as db:
+            db.execute(
+                f"UPDATE tasks SET lease_expires = ? WHERE owner = ? AND status = 'leased' AND id IN ({marks})",
+                [time.time() + lease_seconds, owner, *task_ids]
+            )
+
+    def complete(self, owner: str, task_id: int):
+        """标记任务完成（租约已被他人接管时忽略）"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE tasks SET status = 'done', error = NULL, updated = ? "
+                "WHERE id = ? AND owner = ? AND status = 'leased'",
+                (time.time(), task_id, owner)
+            )
+
+    def fail(self, owner: str, task_id: int, error: str):
+        """记录任务失败，未超过最大尝试次数时放回队列重试"""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_expires = NULL, updated = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                (self.max_attempts, error, time.time(), task_id, owner)
+            )
+
+    def counts(self) -> dict:
+        """各状态的任务数，过期租约计入 pending，已用完尝试次数的过期租约计入 failed"""
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        rows = self.connection.execute(
+            "SELECT CASE WHEN status = 'leased' AND lease_expires < ? "
+            "THEN CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END ELSE status END AS state, "
+            "COUNT(*) AS n FROM tasks GROUP BY state",
+            (time.time(), self.max_attempts)
+        )
+        for row in rows:
+            counts[row["state"]] = row["n"]
+        return counts
+
+    def failures(self) -> List[dict]:
+        """已放弃的任务及最后一次错误"""
+        with self._transaction() as db:
+            self._expire(db, time.time())
+        rows = self.connection.execute(
+            "SELECT document, page, attempts, error FROM tasks WHERE status = 'failed' ORDER BY document, page"
+        )
+        return [dict(row) for row in rows]
+
+
+def enqueue_documents(
+    queue: PageQueue,
+    pdf_paths: List[str],
+    output_dir: Optional[str] = None,
+    page_range: Optional[str] = None,
+    log_callback: Optional[callable] = None,
+    **options
+) -> int:
+    """
+    协调端：把PDF文件拆分为页面任务写入队列
+
+    每个文档输出到 output_dir/文件名 子目录，与 multi_pdf_to_images 的目录结构一致。
+
+    Returns:
+        新增的任务总数
+    """
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            print(message)
+
+    unknown = set(options) - set(TASK_OPTIONS)
+    if unknown:
+        raise ValueError(f"队列任务不支持的参数: {', '.join(sorted(unknown))}")
+
+    total = 0
+    for pdf_path in pdf_paths:
+        pdf_name = Path(pdf_path).stem
+        document_dir = os.path.join(output_dir or os.path.dirname(os.path.abspath(pdf_path)), pdf_name)
+        pdf_document = open_pdf(pdf_path)
+        try:
+            pages = [n + 1 for n in select_pages(page_range, len(pdf_document))]
+        finally:
+            pdf_document.close()
+        added = queue.enqueue(os.path.normpath(pdf_path), pages, document_dir, options)
+        total += added
+        log(f"{pdf_path}: 新增 {added} 个页面任务（共选中 {len(pages)} 页）")
+    return total
+
+
+def run_worker(
+    queue: PageQueue,
+    owner: Optional[str] = None,
+    batch: int = 4,
+    lease_seconds: float = 300.0,
+    poll_interval: float = 2.0,
+    wait: bool = False,
+    event_callback: Optional[callable] = None,
+    log_callback: Optional[callable] = None
+) -> dict:
+    """
+    工作端：循环领取并转换任务，直到队列中没有可领取的任务
+
+    Args:
+        queue: 任务队列
+        owner: 工作端标识，默认 主机名:进程号
+        batch: 每次领取的任务数
+        lease_seconds: 租约时长，处理每个任务前会续约
+        poll_interval: 其他工作端仍持有租约时的轮询间隔（秒）
+        wait: 为True时在其他租约完成前持续等待（以便接管过期租约），否则队列无待领取任务即退出
+        event_callback: 接收 pdf_to_images 的结构化事件，page 事件附带 worker 字段
+        log_callback: 日志回调函数
+
+    Returns:
+        本工作端的统计 {"done": n, "failed": n}
+    """
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            print(message)
+
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    pool = DocumentPool(max_open=4)
+    stats = {"done": 0, "failed": 0}
+
+    def forward(event):
+        if event_callback and event["event"] == "page":
+            event_callback(dict(event, worker=owner))
+
+    try:
+        while True:
+            tasks = queue.lease(owner, batch, lease_seconds)
+            if not tasks:
+                counts = queue.counts()
+                if wait and counts["leased"]:
+                    time.sleep(poll_interval)
+                    continue
+                break
+
+            pending_ids = [task["id"] for task in tasks]
+            for task in tasks:
+                queue.renew(owner, pending_ids, lease_seconds)
+                pending_ids.remove(task["id"])
+                options = json.loads(task["options"])
+                report = BatchReport(forward=forward)
+                try:
+                    pdf_to_images(
+                        task["document"],
+                        task["output_dir"],
+                        page_range=str(task["page"]),
+                        log_callback=lambda message: None,
+                        pool=pool,
+                        event_callback=report,
+                        **options
+                    )
+                    if report.failed:
+                        raise RuntimeError(_first_error(report))
+                except Exception as e:
+                    queue.fail(owner, task["id"], str(e))
+                    stats["failed"] += 1
+                    log(f"失败: {task['document']} 第 {task['page']} 页: {str(e)}")
+                else:
+                    queue.complete(owner, task["id"])
+                    stats["done"] += 1
+                    log(f"完成: {task['document']} 第 {task['page']} 页")
+    finally:
+        pool.close_all()
+    return stats
+
+
+def _first_error(report: BatchReport) -> str:
+    for document in report.documents.values():
+        for error in document["errors"]:
+            return f"{error['type']}: {error['message']}"
+    return "转换失败"
+
+
+def merge_manifests(manifest_paths: List[str]) -> dict:
+    """
+    合并各工作端/分片写出的清单（JSON Lines，page 事件）
+
+    同一 (文档, 页码) 出现多次时（重试或租约被接管），以最后一条成功记录为准。
+
+    Returns:
+        {"pages": [...], "totals": {...}}，页面按文档和页码排序
+    """
+    pages = {}
+    for manifest_path in manifest_paths:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("event") != "page":
+                    continue
+                key = (event["document"], event["page"])
+                if event.get("status") == "ok" or key not in pages or pages[key].get("status") != "ok":
+                    pages[key] = event
+
+    ordered = [pages[key] for key in sorted(pages)]
+    totals = {"documents": len({key[0] for key in pages}), "pages": len(ordered)}
+    for event in ordered:
+        totals[event.get("status", "ok")] = totals.get(event.get("status", "ok"), 0) + 1
+    return {"pages": ordered, "totals": totals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分布式PDF转图片：页面任务队列")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="把PDF拆分为页面任务写入队列")
+    enqueue.add_argument("queue", help="队列文件 (SQLite)")
+    enqueue.add_argument("pdf_paths", nargs="+", help="PDF文件路径")
+    enqueue.add_argument("-o", "--output", help="输出目录，每个PDF输出到其中的同名子目录")
+    enqueue.add_argument("-f", "--format", choices=["PNG", "JPEG"], default="PNG", help="输出格式")
+    enqueue.add_argument("-q", "--quality", choices=["一般", "清晰", "高清", "打印"], help="质量等级")
+    enqueue.add_argument("-d", "--dpi", type=int, default=200, help="DPI值")
+    enqueue.add_argument("--width", type=int, help="目标宽度（像素）")
+    enqueue.add_argument("--height", type=int, help="目标高度（像素）")
+    enqueue.add_argument("--max-pixels", type=int, help="每页最大像素数")
+    enqueue.add_argument("--auto-dpi", action="store_true", help="按页面内容自动选择DPI")
+    enqueue.add_argument("--skip-blank", action="store_true", help="跳过空白页")
+    enqueue.add_argument("--pages", help="页面选择，如 '1-3,5,10-'")
+
+    work = commands.add_parser("work", help="领取并转换队列中的任务")
+    work.add_argument("queue", help="队列文件 (SQLite)")
+    work.add_argument("--manifest", help="把本工作端完成的页面追加写入该清单 (JSON Lines)")
+    work.add_argument("--worker-id", help="工作端标识，默认 主机名:进程号")
+    work.add_argument("--batch", type=int, default=4, help="每次领取的任务数")
+    work.add_argument("--lease", type=float, default=300.0, help="租约时长（秒）")
+    work.add_argument("--max-attempts", type=int, default=3, help="每个任务的最大尝试次数")
+    work.add_argument("--wait", action="store_true", help="等待其他工作端的租约结束，以接管过期任务")
+
+    status = commands.add_parser("status", help="显示队列状态")
+    status.add_argument("queue", help="队列文件 (SQLite)")
+
+    merge = commands.add_parser("merge", help="合并各工作端/分片的清单")
+    merge.add_argument("manifests", nargs="+", help="清单文件 (JSON Lines，如 --manifest 或 --progress jsonl 的输出)")
+    merge.add_argument("-o", "--output", help="合并结果输出文件，默认输出到标准输出")
+
+    args = parser.parse_args(_join_page_arguments(sys.argv[1:]))
+
+    if args.command == "merge":
+        merged = merge_manifests(args.manifests)
+        text = json.dumps(merged, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"已合并 {merged['totals']['pages']} 页到: {args.output}")
+        else:
+            print(text)
+        return 0
+
+    queue = PageQueue(args.queue, max_attempts=getattr(args, "max_attempts", 3))
+    try:
+        if args.command == "enqueue":
+            options = {
+                "output_format": args.format,
+                "dpi": quality_to_dpi(args.quality) if args.quality else args.dpi,
+                "width": args.width,
+                "height": args.height,
+                "max_pixels": args.max_pixels,
+                "auto_dpi": args.auto_dpi,
+                "skip_blank": args.skip_blank,
+            }
+            try:
+                total = enqueue_documents(queue, args.pdf_paths, args.output, args.pages, **options)
+            except Exception as e:
+                print(f"错误: {str(e)}")
+                return 1
+            print(f"共新增 {total} 个页面任务")
+            return 0
+
+        if args.command == "work":
+            manifest = open(args.manifest, "a", encoding="utf-8") if args.manifest else None
+
+            def write_manifest(event):
+                manifest.write(json.dumps(event, ensure_ascii=False) + "\n")
+                manifest.flush()
+
+            try:
+                stats = run_worker(
+                    queue,
+                    owner=args.worker_id,
+                    batch=args.batch,
+                    lease_seconds=args.lease,
+                    wait=args.wait,
+                    event_callback=write_manifest if manifest else None
+                )
+            finally:
+                if manifest:
+                    manifest.close()
+            print(f"本工作端完成 {stats['done']} 个任务，失败 {stats['failed']} 次")
+
+        counts = queue.counts()
+        print(
+            f"队列状态: 待处理 {counts['pending']}，处理中 {counts['leased']}，"
+            f"已完成 {counts['done']}，失败 {counts['failed']}"
+        )
+        for failure in queue.failures():
+            print(f"  失败: {failure['document']} 第 {failure['page']} 页 (尝试 {failure['attempts']} 次): {failure['error']}")
+        return 2 if counts["failed"] else 0
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
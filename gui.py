@@ -3,8 +3,7 @@ from tkinterdnd2 import DND_FILES, TkinterDnD
 import threading
 import os
 from pathlib import Path
-import fitz  # PyMuPDF
-from main import pdf_to_images, multi_pdf_to_images
+from main import pdf_to_images, multi_pdf_to_images, parse_page_spec, select_pages, get_document_pool
 from tkinter import messagebox, filedialog
 import tkinter as tk
 
@@ -48,7 +47,8 @@ class CompactPDFToImageGUI:
             "一般": 150,
             "清晰": 200, 
             "高清": 300,
-            "打印": 600
+            "打印": 600,
+            "自动": 600
         }
         return quality_map.get(quality, 200)
         
@@ -166,6 +166,7 @@ class CompactPDFToImageGUI:
         
     def close_window(self):
         """关闭窗口"""
+        get_document_pool().close_all()
         self.root.quit()
         
     def center_window(self):
@@ -414,7 +415,7 @@ class CompactPDFToImageGUI:
         quality_combo = ctk.CTkComboBox(
             format_dpi_frame,
             variable=self.quality_var,
-            values=["一般", "清晰", "高清", "打印"],
+            values=["一般", "清晰", "高清", "打印", "自动"],
             state="readonly",
             width=100,
             height=28,
@@ -457,33 +458,18 @@ class CompactPDFToImageGUI:
         self.range_input_frame = ctk.CTkFrame(self.pages_frame, fg_color=self.colors['card'])
         self.range_input_frame.grid(row=2, column=0, columnspan=4, sticky="ew", pady=(5, 0))
         
-        ctk.CTkLabel(self.range_input_frame, text="从", font=ctk.CTkFont(size=16)).pack(side="left")
+        ctk.CTkLabel(self.range_input_frame, text="页码", font=ctk.CTkFont(size=16)).pack(side="left")
         
-        self.start_page_var = ctk.StringVar(value="1")
-        self.start_page_entry = ctk.CTkEntry(
+        self.pages_spec_var = ctk.StringVar(value="1")
+        self.pages_spec_entry = ctk.CTkEntry(
             self.range_input_frame,
-            textvariable=self.start_page_var,
-            width=60,
-            height=28,
-            state="disabled",
-            font=ctk.CTkFont(size=16)
-        )
-        self.start_page_entry.pack(side="left", padx=(3, 3))
-        
-        ctk.CTkLabel(self.range_input_frame, text="到", font=ctk.CTkFont(size=16)).pack(side="left")
-        
-        self.end_page_var = ctk.StringVar(value="1")
-        self.end_page_entry = ctk.CTkEntry(
-            self.range_input_frame,
-            textvariable=self.end_page_var,
-            width=60,
+            textvariable=self.pages_spec_var,
+            width=170,
             height=28,
             state="disabled",
             font=ctk.CTkFont(size=16)
         )
-        self.end_page_entry.pack(side="left", padx=(3, 3))
-        
-        ctk.CTkLabel(self.range_input_frame, text="页", font=ctk.CTkFont(size=16)).pack(side="left")
+        self.pages_spec_entry.pack(side="left", padx=(3, 3))
         
     def setup_right_panel(self, parent):
         """设置右侧日志面板"""
@@ -648,8 +634,7 @@ class CompactPDFToImageGUI:
         """清空所有设置"""
         self.current_pdfs = []
         self.output_var.set("")
-        self.start_page_var.set("1")
-        self.end_page_var.set("1")
+        self.pages_spec_var.set("1")
         self.total_pages = 0
         self.pdf_info_var.set("")
         self.output_mode_var.set("same")
@@ -676,18 +661,13 @@ class CompactPDFToImageGUI:
                 if page_count:
                     self.total_pages = page_count
                     self.pdf_info_var.set(f"总页数: {page_count} 页")
-                    if self.pages_mode_var.get() == "all":
-                        self.end_page_var.set(str(page_count))
                 else:
                     self.total_pages = 0
                     self.pdf_info_var.set("无法读取页面信息")
             else:
-                # 多文件模式
+                # 多文件模式，页面选择分别应用于每个文件
                 self.total_pages = 0
                 self.pdf_info_var.set(f"已选择 {len(self.current_pdfs)} 个PDF文件")
-                # 多文件时强制为全部页面模式
-                self.pages_mode_var.set("all")
-                self.on_pages_mode_change()
         self.file_listbox.configure(state="disabled")
         
     def log_message(self, message):
@@ -716,40 +696,21 @@ class CompactPDFToImageGUI:
             
     def on_pages_mode_change(self):
         """页面范围模式变化处理"""
-        # 多文件时强制全部页面模式并禁用自定义选项
-        if len(self.current_pdfs) > 1:
-            self.pages_mode_var.set("all")
-            # 禁用自定义页面选项
-            for widget in self.pages_frame.winfo_children():
-                if isinstance(widget, ctk.CTkRadioButton) and widget.cget("value") == "custom":
-                    widget.configure(state="disabled")
-                    
-        else:
-            # 启用自定义页面选项
-            for widget in self.pages_frame.winfo_children():
-                if isinstance(widget, ctk.CTkRadioButton) and widget.cget("value") == "custom":
-                    widget.configure(state="normal")
-        
         if self.pages_mode_var.get() == "all":
-            self.start_page_entry.configure(state="disabled")
-            self.end_page_entry.configure(state="disabled")
-            self.start_page_var.set("1")
-            self.end_page_var.set(str(self.total_pages) if self.total_pages > 0 else "1")
-            # 隐藏页面范围输入控件
+            self.pages_spec_entry.configure(state="disabled")
+            # 隐藏页面选择输入控件
             self.range_input_frame.grid_remove()
         else:
-            self.start_page_entry.configure(state="normal")
-            self.end_page_entry.configure(state="normal")
-            # 显示页面范围输入控件
+            self.pages_spec_entry.configure(state="normal")
+            # 显示页面选择输入控件
             self.range_input_frame.grid(row=2, column=0, columnspan=4, sticky="ew", pady=(5, 0))
             
     def get_pdf_page_count(self, pdf_path):
         """获取PDF页面数"""
         try:
-            pdf_document = fitz.open(pdf_path)
-            page_count = len(pdf_document)
-            pdf_document.close()
-            return page_count
+            # 文档保留在池中，转换时无需重新解析
+            with get_document_pool().document(pdf_path) as pdf_document:
+                return len(pdf_document)
         except Exception as e:
             self.log_message(f"读取页数失败: {str(e)}")
             return None
@@ -760,19 +721,6 @@ class CompactPDFToImageGUI:
         if page_count:
             self.total_pages = page_count
             self.pdf_info_var.set(f"总页数: {page_count} 页")
-            if self.pages_mode_var.get() == "all":
-                self.end_page_var.set(str(page_count))
-            else:
-                try:
-                    start = int(self.start_page_var.get())
-                    end = int(self.end_page_var.get())
-                    if start > page_count:
-                        self.start_page_var.set("1")
-                    if end > page_count:
-                        self.end_page_var.set(str(page_count))
-                except ValueError:
-                    self.start_page_var.set("1")
-                    self.end_page_var.set(str(page_count))
         else:
             self.total_pages = 0
             self.pdf_info_var.set("无法读取页面信息")
@@ -789,35 +737,18 @@ class CompactPDFToImageGUI:
                 messagebox.showerror("错误", f"PDF文件不存在：{os.path.basename(pdf_path)}")
                 return False
                 
-        # 单文件时验证页面范围
-        if len(self.current_pdfs) == 1 and self.pages_mode_var.get() == "custom":
+        # 验证页面选择
+        if self.pages_mode_var.get() == "custom":
             try:
-                start_page = int(self.start_page_var.get())
-                end_page = int(self.end_page_var.get())
-                
-                if start_page < 1:
-                    messagebox.showerror("错误", "起始页面不能小于1！")
-                    return False
-                    
-                if self.total_pages > 0 and start_page > self.total_pages:
-                    messagebox.showerror("错误", f"起始页面不能大于总页数({self.total_pages})！")
-                    return False
-                    
-                if end_page < 1:
-                    messagebox.showerror("错误", "结束页面不能小于1！")
-                    return False
-                    
-                if self.total_pages > 0 and end_page > self.total_pages:
-                    messagebox.showerror("错误", f"结束页面不能大于总页数({self.total_pages})！")
-                    return False
-                    
-                if start_page > end_page:
-                    messagebox.showerror("错误", "起始页面不能大于结束页面！")
-                    return False
-                    
-            except ValueError:
-                messagebox.showerror("错误", "页面范围必须是数字！")
+                parse_page_spec(self.pages_spec_var.get())
+            except ValueError as e:
+                messagebox.showerror("错误", f"页面选择格式不正确：{str(e)}")
                 return False
+            
+            if len(self.current_pdfs) == 1 and self.total_pages > 0:
+                if not select_pages(self.pages_spec_var.get(), self.total_pages):
+                    messagebox.showerror("错误", f"所选页面超出总页数({self.total_pages})！")
+                    return False
                 
         return True
         
@@ -847,21 +778,21 @@ class CompactPDFToImageGUI:
             output_format = self.format_var.get()
             quality = self.quality_var.get()
             dpi = self.quality_to_dpi(quality)
+            auto_dpi = quality == "自动"
+            
+            page_range = None
+            if self.pages_mode_var.get() == "custom":
+                page_range = self.pages_spec_var.get().strip()
             
             if len(self.current_pdfs) == 1:
                 # 单文件转换
                 pdf_path = self.current_pdfs[0]
-                page_range = None
-                if self.pages_mode_var.get() == "custom":
-                    start_page = int(self.start_page_var.get())
-                    end_page = int(self.end_page_var.get())
-                    page_range = (start_page, end_page)
                 
                 self.log_message(f"开始转换: {os.path.basename(pdf_path)}")
                 self.log_message(f"输出目录: {os.path.basename(output_dir)}")
                 self.log_message(f"格式: {output_format}, 清晰度: {quality} ({dpi} DPI)")
                 if page_range:
-                    self.log_message(f"页面: {page_range[0]}-{page_range[1]}")
+                    self.log_message(f"页面: {page_range}")
                 else:
                     self.log_message("转换所有页面")
                     
@@ -871,21 +802,29 @@ class CompactPDFToImageGUI:
                     output_format,
                     dpi,
                     page_range,
-                    self.log_message_safe
+                    self.log_message_safe,
+                    pool=get_document_pool(),
+                    auto_dpi=auto_dpi
                 )
             else:
                 # 多文件转换
                 self.log_message(f"开始批量转换 {len(self.current_pdfs)} 个PDF文件")
                 self.log_message(f"输出目录: {os.path.basename(output_dir)}")
                 self.log_message(f"格式: {output_format}, 清晰度: {quality} ({dpi} DPI)")
-                self.log_message("模式: 全部页面（多文件模式）")
+                if page_range:
+                    self.log_message(f"页面: {page_range}（应用于每个文件）")
+                else:
+                    self.log_message("转换所有页面")
                 
                 output_files = multi_pdf_to_images(
                     self.current_pdfs,
                     output_dir,
                     output_format,
                     dpi,
-                    self.log_message_safe
+                    self.log_message_safe,
+                    page_range,
+                    pool=get_document_pool(),
+                    auto_dpi=auto_dpi
                 )
             
             self.root.after(0, lambda: self.conversion_complete(output_files))
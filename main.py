@@ -1,100 +1,1793 @@
 import argparse
 import os
 import sys
-import io
+import hashlib
+import json
+import threading
+import time
+import math
+import mmap
+import multiprocessing
+import re
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional
-import fitz  # PyMuPDF
-from PIL import Image
+from typing import TYPE_CHECKING, List, Optional, Union
+
+# PyMuPDF 和 Pillow 导入较慢，延迟到实际转换时再导入，
+# 使 --help 和参数错误等情况无需加载它们
+if TYPE_CHECKING:
+    import pymupdf as fitz
+
+
+def _import_fitz():
+    """导入PyMuPDF；新版本以 pymupdf 为模块名，导入 fitz 会向标准输出打印弃用警告"""
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz
+    return fitz
+
+
+# PDF输入：文件路径，或内存中的字节数据/内存映射
+PdfSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap]
+
+_PAGE_TERM_RE = re.compile(r"^(-?\d+)(?:-(-?\d+)?)?$")
+
+
+def parse_page_spec(spec: str) -> List[tuple]:
+    """
+    解析页面选择表达式
+
+    支持以逗号分隔的多个条目（页码从1开始）：
+        N        单页，负数表示倒数第N页 (例: -1 为最后一页)
+        A-B      页面区间，A、B均可为负数 (例: 2-5, -3--1)
+        A-       从第A页到最后一页
+        odd      奇数页
+        even     偶数页
+        all / *  全部页面
+
+    Args:
+        spec: 页面选择表达式，例如 "1,3,5-9,-2,odd"
+
+    Returns:
+        解析后的条目列表，供 select_pages 使用
+
+    Raises:
+        ValueError: 表达式格式不正确
+    """
+    terms = []
+    for raw in spec.split(","):
+        term = raw.strip().lower()
+        if not term:
+            continue
+        if term in ("all", "*"):
+            terms.append(("range", 1, None))
+        elif term in ("odd", "even"):
+            terms.append((term,))
+        else:
+            match = _PAGE_TERM_RE.match(term)
+            if not match:
+                raise ValueError(f"无法识别的页面选择: '{raw.strip()}'")
+            start = int(match.group(1))
+            if start == 0:
+                raise ValueError(f"页码不能为0: '{raw.strip()}'")
+            if "-" not in term.lstrip("-"):
+                terms.append(("range", start, start))
+            else:
+                end = int(match.group(2)) if match.group(2) else None
+                if end == 0:
+                    raise ValueError(f"页码不能为0: '{raw.strip()}'")
+                terms.append(("range", start, end))
+    if not terms:
+        raise ValueError("页面选择不能为空")
+    return terms
+
+
+def select_pages(
+    page_range: Union[str, tuple, None],
+    total_pages: int
+) -> List[int]:
+    """
+    将页面选择解析为按升序排列、去重后的页面索引（从0开始）
+
+    Args:
+        page_range: 页面选择表达式、(开始页, 结束页) 元组或 None（全部页面）
+        total_pages: 文档总页数
+
+    Returns:
+        页面索引列表，超出文档范围的页面会被忽略
+    """
+    if page_range is None or page_range == ():
+        return list(range(total_pages))
+    if isinstance(page_range, tuple):
+        # 元组保持原有含义：页码从1开始，超出范围的部分截断，不支持负数倒数
+        start_page = max(0, page_range[0] - 1)
+        end_page = min(total_pages, page_range[1])
+        return list(range(start_page, end_page))
+    
+    def resolve(num):
+        return num if num > 0 else total_pages + num + 1
+    
+    selected = set()
+    for term in parse_page_spec(page_range):
+        if term[0] == "odd":
+            selected.update(range(0, total_pages, 2))
+        elif term[0] == "even":
+            selected.update(range(1, total_pages, 2))
+        else:
+            start = max(1, resolve(term[1]))
+            end = total_pages if term[2] is None else min(total_pages, resolve(term[2]))
+            selected.update(range(start - 1, end))
+    return sorted(selected)
+
+
+def _join_page_arguments(argv: List[str], option: str = "--pages") -> List[str]:
+    """
+    argparse 会把以 - 开头的值（如 -3--1、-2,odd）当作选项，
+    将 "--pages 值" 合并为 "--pages=值"，倒数页码可以直接写在选项后
+    """
+    joined = []
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        if arg == option and index + 1 < len(argv) and re.match(r"-\d", argv[index + 1]):
+            joined.append(f"{option}={argv[index + 1]}")
+            index += 2
+            continue
+        joined.append(arg)
+        index += 1
+    return joined
+
+
+def parse_shard(spec: str) -> tuple:
+    """
+    解析分片参数 "i/N"（i 从0开始）
+
+    Returns:
+        (分片序号, 分片总数)
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式应为 'i/N': '{spec}'")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片序号应在 0 到 N-1 之间: '{spec}'")
+    return index, count
+
+
+def shard_of(document: str, page: int, count: int) -> int:
+    """
+    按 文档路径+页码 的稳定哈希计算页面所属分片
+
+    哈希与进程和主机无关，各主机使用相同的文件路径参数即可得到互不重叠的分片。
+
+    Args:
+        document: 文档路径（按传入形式规范化，不转换为绝对路径）
+        page: 页码（从1开始）
+        count: 分片总数
+    """
+    key = f"{os.path.normpath(document)}:{page}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") % count
+
+
+def page_zoom(
+    page_rect,
+    dpi: int = 200,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> float:
+    """
+    根据页面尺寸计算渲染缩放因子
+
+    指定宽度/高度时按目标尺寸缩放（同时指定时等比缩放至不超过该尺寸），
+    否则按DPI缩放；max_pixels 进一步限制输出像素总数。
+
+    Args:
+        page_rect: 页面矩形 (page.rect)，单位为点 (1/72 英寸)
+        dpi: 图片分辨率，未指定宽度/高度时使用
+        width: 目标宽度（像素）
+        height: 目标高度（像素）
+        max_pixels: 最大像素数（宽×高）
+
+    Returns:
+        缩放因子
+    """
+    page_width = max(page_rect.width, 1)
+    page_height = max(page_rect.height, 1)
+    
+    if width and height:
+        zoom = min(width / page_width, height / page_height)
+    elif width:
+        zoom = width / page_width
+    elif height:
+        zoom = height / page_height
+    else:
+        zoom = dpi / 72.0  # PyMuPDF使用72 DPI作为基准
+    
+    if max_pixels and page_width * page_height * zoom * zoom > max_pixels:
+        zoom = (max_pixels / (page_width * page_height)) ** 0.5
+        # 渲染尺寸向上取整，确保取整后仍不超过像素上限
+        while math.ceil(page_width * zoom) * math.ceil(page_height * zoom) > max_pixels:
+            zoom *= 0.999
+    
+    return zoom
+
+
+def page_auto_dpi(page, max_dpi: int = 600, min_dpi: int = 72) -> int:
+    """
+    根据页面内容选择不损失细节的最低DPI
+
+    含文字或矢量图形的页面与分辨率无关，使用 max_dpi；
+    仅含图片的页面使用嵌入图片的最高有效分辨率；空白页面使用 min_dpi。
+
+    Args:
+        page: fitz.Page
+        max_dpi: DPI上限（所选清晰度挡位）
+        min_dpi: DPI下限
+
+    Returns:
+        该页面的渲染DPI
+    """
+    if page.get_text("text").strip() or page.get_cdrawings():
+        return max_dpi
+    
+    image_dpi = 0
+    for info in page.get_image_info():
+        a, b, c, d = info["transform"][:4]
+        # 图片在页面上的显示尺寸（点），考虑旋转和缩放
+        shown_width = math.hypot(a, b)
+        shown_height = math.hypot(c, d)
+        if shown_width <= 0 or shown_height <= 0:
+            continue
+        image_dpi = max(
+            image_dpi,
+            info["width"] * 72.0 / shown_width,
+            info["height"] * 72.0 / shown_height
+        )
+    
+    return int(min(max_dpi, max(min_dpi, math.ceil(image_dpi))))
+
+
+_BLANK_PROBE_DPI = 24  # 空白页检测的探测渲染分辨率
+_INK_LEVEL = 200  # 灰度低于该值的像素视为有墨迹
+
+
+def is_blank_page(page, ink_threshold: float = 0.002) -> bool:
+    """
+    判断页面是否为空白页
+
+    先检查页面内容：没有文字、矢量图形和图片的页面直接判定为空白；
+    否则以低分辨率灰度渲染探测，墨迹像素比例不超过 ink_threshold 时判定为空白
+    （例如扫描的空白分隔页）。
+
+    Args:
+        page: fitz.Page
+        ink_threshold: 墨迹像素比例阈值
+
+    Returns:
+        是否为空白页
+    """
+    fitz = _import_fitz()
+    
+    if not (page.get_text("text").strip() or page.get_cdrawings() or page.get_image_info()):
+        return True
+    
+    zoom = _BLANK_PROBE_DPI / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    samples = pix.samples
+    if not samples:
+        return True
+    # 删除所有深色（低于 _INK_LEVEL）字节，减少的字节数即为墨迹像素数
+    ink = len(samples) - len(samples.translate(None, bytes(range(_INK_LEVEL))))
+    return ink / len(samples) <= ink_threshold
+
+
+class _MappedPdf(mmap.mmap):
+    """map_pdf 返回的映射，记录源文件路径，供非 fork 启动的工作进程自行映射"""
+    path = None
+
+
+def map_pdf(pdf_path: str) -> mmap.mmap:
+    """
+    以只读方式将PDF文件映射到内存
+
+    返回的映射可作为输入多次传给 pdf_to_images / pdf_to_arrays，
+    多个线程和并行转换的工作进程共享同一映射，不会重复读取文件。
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        只读内存映射
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+    with open(pdf_path, "rb") as f:
+        mapped = _MappedPdf(f.fileno(), 0, access=mmap.ACCESS_READ)
+    mapped.path = os.path.abspath(pdf_path)
+    return mapped
+
+
+def _is_memory_source(source) -> bool:
+    return isinstance(source, (bytes, bytearray, memoryview, mmap.mmap))
+
+
+def _check_source(source):
+    """检查PDF输入是否存在"""
+    if not _is_memory_source(source) and not os.path.exists(source):
+        raise FileNotFoundError(f"PDF文件不存在: {source}")
+
+
+def _open_locked(source: PdfSource) -> "fitz.Document":
+    """打开PDF文档，加密文档保持锁定状态"""
+    fitz = _import_fitz()
+    
+    _check_source(source)
+    if isinstance(source, (mmap.mmap, bytearray)):
+        # PyMuPDF 对 bytearray 执行 bytes(stream) 完整复制，memoryview 则直接引用
+        source = memoryview(source)
+    if _is_memory_source(source):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _unlock(pdf_document, password: Optional[str] = None):
+    """
+    验证加密文档的密码（文档池中已解锁的文档同样重新验证）
+
+    Raises:
+        PermissionError: 文档已加密但未提供密码或密码错误
+    """
+    if not pdf_document.needs_pass:
+        return
+    if not password:
+        raise PermissionError("PDF文件已加密，请提供密码")
+    if not pdf_document.authenticate(password):
+        raise PermissionError("PDF密码错误")
+
+
+def open_pdf(source: PdfSource, password: Optional[str] = None) -> "fitz.Document":
+    """
+    打开PDF文档，支持文件路径、bytes、memoryview 和 mmap
+
+    内存输入通过 fitz.open(stream=...) 直接引用，不会复制或写入临时文件；
+    bytearray 在文档关闭前不能修改。
+
+    Args:
+        source: PDF文件路径或内存数据
+        password: 加密文档的密码
+
+    Returns:
+        fitz.Document
+
+    Raises:
+        PermissionError: 文档已加密但未提供密码或密码错误
+    """
+    pdf_document = _open_locked(source)
+    try:
+        _unlock(pdf_document, password)
+    except PermissionError:
+        pdf_document.close()
+        raise
+    return pdf_document
+
+
+class DocumentPool:
+    """
+    已打开PDF文档的LRU池，供长期运行的进程重复转换同一文件时复用
+
+    文件输入以 路径+修改时间+大小 为键，内存输入以内容哈希为键，文件变化后自动失效。
+    不可变的内存输入（bytes、只读 mmap/memoryview）按对象缓存内容哈希，同一对象再次借出时不重新计算。
+    文档内存占用以PDF数据大小估算。MuPDF文档对象不是线程安全的，
+    同一文档在被使用期间会被锁定，其他线程需等待归还。
+    """
+    
+    def __init__(self, max_open: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            max_open: 最多保持打开的文档数
+            max_bytes: 已打开文档的内存预算（按PDF数据大小估算）
+        """
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> [document, size, lock, users]
+        self._digests = {}  # id(内存输入) -> (内存输入, key, size)，随对应条目一起清理
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def _key(self, source):
+        if _is_memory_source(source):
+            cached = self._digests.get(id(source))
+            if cached is not None and cached[0] is source:
+                return cached[1], cached[2]
+            with memoryview(source) as view:
+                key = ("memory", hashlib.blake2b(view, digest_size=16).hexdigest())
+                size = view.nbytes
+                immutable = view.readonly
+            if immutable:
+                # 缓存项持有输入对象，对象存活期间 id 不会被复用
+                with self._lock:
+                    self._digests[id(source)] = (source, key, size)
+            return key, size
+        path = os.path.abspath(os.fspath(source))
+        stat = os.stat(path)
+        return ("file", path, stat.st_mtime_ns, stat.st_size), stat.st_size
+    
+    @contextmanager
+    def document(self, source: PdfSource, password: Optional[str] = None):
+        """借出一个已打开的文档，退出上下文时归还到池中；加密文档每次借出都验证密码"""
+        _check_source(source)
+        key, size = self._key(source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self._misses += 1
+                entry = [None, size, threading.Lock(), 0]
+                self._entries[key] = entry
+            entry[3] += 1
+        
+        try:
+            with entry[2]:
+                if entry[0] is None:
+                    entry[0] = _open_locked(source)
+                _unlock(entry[0], password)
+                yield entry[0]
+        finally:
+            with self._lock:
+                entry[3] -= 1
+                if entry[0] is None and entry[3] == 0:
+                    # 打开失败，不保留空条目
+                    self._entries.pop(key, None)
+                self._evict()
+    
+    def _evict(self):
+        """按LRU顺序关闭空闲文档，直到满足数量和内存预算（需持有 self._lock）"""
+        total = sum(entry[1] for entry in self._entries.values())
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_open and total <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry[3] > 0:
+                continue
+            del self._entries[key]
+            total -= entry[1]
+            if entry[0] is not None:
+                entry[0].close()
+                self._evictions += 1
+        self._prune_digests()
+    
+    def _prune_digests(self):
+        """丢弃已不在池中的内存输入的哈希缓存（需持有 self._lock）"""
+        for source_id, (_, key, _) in list(self._digests.items()):
+            if key not in self._entries:
+                del self._digests[source_id]
+    
+    def close_all(self):
+        """关闭池中所有空闲文档，正在使用的文档不受影响"""
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if entry[3] > 0:
+                    continue
+                del self._entries[key]
+                if entry[0] is not None:
+                    entry[0].close()
+            self._prune_digests()
+    
+    def stats(self) -> dict:
+        """返回命中率等统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "open": len(self._entries),
+                "bytes": sum(entry[1] for entry in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+_document_pool = DocumentPool()
+
+
+_REFERENCE_RE = re.compile(r"(\d+) 0 R")
+# 不影响页面渲染的页面引用：父节点、注释所属页面 /P、链接目标页面 /Dest 和动作的 /D。
+# 链接注释沿这些引用可以依次到达文档中的每一页，既无意义又会使遍历深度与页数成正比
+_PAGE_LINK_RE = re.compile(r"/(?:Parent|P) *\d+ 0 R|(?<=/Dest)( *\[ *)\d+ 0 R|(?<=/D)( *\[ *)\d+ 0 R")
+
+
+def _strip_page_links(source):
+    return _PAGE_LINK_RE.sub(lambda m: m.group(1) or m.group(2) or "", source)
+
+
+def _object_digest(pdf_document, xref, memo):
+    """
+    计算PDF对象及其引用对象的内容哈希，与对象编号无关
+
+    以显式栈深度优先遍历引用，深层的引用链不会超出递归深度；
+    遍历中的对象以 "cycle" 占位，循环引用不会无限展开。
+    """
+    if xref in memo:
+        return memo[xref]
+    
+    def enter(xref):
+        memo[xref] = "cycle"  # 循环引用占位
+        source = _strip_page_links(pdf_document.xref_object(xref, compressed=True))
+        return xref, source, _REFERENCE_RE.finditer(source)
+    
+    stack = [enter(xref)]
+    while stack:
+        current, source, references = stack[-1]
+        for match in references:
+            child = int(match.group(1))
+            if child not in memo:
+                stack.append(enter(child))
+                break
+        else:
+            stack.pop()
+            h = hashlib.blake2b(digest_size=16)
+            h.update(_REFERENCE_RE.sub(lambda m: memo[int(m.group(1))], source).encode())
+            if pdf_document.xref_is_stream(current):
+                h.update(pdf_document.xref_stream_raw(current) or b"")
+            memo[current] = h.hexdigest()
+    return memo[xref]
+
+
+def page_fingerprint(pdf_document, page, memo: Optional[dict] = None) -> str:
+    """
+    渲染前计算页面指纹：页面边界框、内容流、资源（含继承的资源）、透明组和注释的内容哈希
+
+    内容相同的页面（即使位于不同文档、对象编号不同）指纹相同。
+
+    Args:
+        pdf_document: fitz.Document
+        page: fitz.Page
+        memo: 对象哈希缓存，同一文档的多个页面共用可避免重复计算共享资源
+
+    Returns:
+        十六进制指纹字符串
+    """
+    if memo is None:
+        memo = {}
+    h = hashlib.blake2b(digest_size=20)
+    # page.rect 已归一化到原点，原点不同的裁剪框渲染结果不同，需哈希原始的 CropBox 和 MediaBox
+    h.update(f"{tuple(page.cropbox)}|{tuple(page.mediabox)}|{page.rotation}".encode())
+    for xref in page.get_contents():
+        h.update(pdf_document.xref_stream_raw(xref) or b"")
+    
+    # 页面没有 /Resources 时沿页面树向上查找继承的资源
+    xref = page.xref
+    for key in ("Resources", "Annots", "Group", "UserUnit"):
+        node = xref
+        while node:
+            kind, value = pdf_document.xref_get_key(node, key)
+            if kind != "null" or key != "Resources":
+                break
+            kind, parent = pdf_document.xref_get_key(node, "Parent")
+            node = int(parent.split()[0]) if kind == "xref" else 0
+        h.update(f"/{key}".encode())
+        h.update(_REFERENCE_RE.sub(
+            lambda m: _object_digest(pdf_document, int(m.group(1)), memo), value
+        ).encode())
+    return h.hexdigest()
+
+
+class PageDeduplicator:
+    """
+    跨文档的重复页面索引，相同页面只渲染一次
+
+    重复页面的处理方式：
+        hardlink  创建指向首次渲染结果的硬链接（不支持时退回复制）
+        symlink   创建符号链接
+        manifest  不生成文件，只在清单中记录引用
+    """
+    
+    MODES = ("hardlink", "symlink", "manifest")
+    
+    def __init__(self, mode: str = "hardlink"):
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的去重方式: {mode}")
+        self.mode = mode
+        self.rendered = {}    # 指纹 -> 首次渲染的输出路径
+        self.references = {}  # 重复页面输出路径 -> 原始输出路径
+        self.layouts = {}     # 指纹 -> 首次渲染页面的文字布局（导出文字层时）
+        self.saved_pixels = 0
+    
+    def link(self, fingerprint: str, output_path: str, pixels: int = 0) -> Optional[str]:
+        """
+        为重复页面生成输出，返回生成的文件路径（manifest 模式返回 None）
+        """
+        original = self.rendered[fingerprint]
+        self.references[output_path] = original
+        self.saved_pixels += pixels
+        if self.mode == "manifest":
+            return None
+        if os.path.lexists(output_path):
+            os.remove(output_path)
+        if self.mode == "symlink":
+            os.symlink(os.path.relpath(original, os.path.dirname(output_path)), output_path)
+        else:
+            try:
+                os.link(original, output_path)
+            except OSError:
+                import shutil
+                shutil.copyfile(original, output_path)
+        return output_path
+    
+    def report(self) -> dict:
+        """返回去重统计"""
+        return {
+            "unique": len(self.rendered),
+            "duplicates": len(self.references),
+            "saved_pixels": self.saved_pixels,
+        }
+    
+    def write_manifest(self, path: str):
+        """将重复页面引用写入JSON清单"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "references": self.references, **self.report()},
+                      f, ensure_ascii=False, indent=2)
+
+
+def get_document_pool() -> DocumentPool:
+    """返回进程级共享的文档池"""
+    return _document_pool
+
+
+@contextmanager
+def _open_document(source, pool=None, password=None):
+    """打开文档；指定文档池时从池中借用，否则用完即关闭"""
+    if pool is not None:
+        with pool.document(source, password) as pdf_document:
+            yield pdf_document
+    else:
+        pdf_document = open_pdf(source, password)
+        try:
+            yield pdf_document
+        finally:
+            pdf_document.close()
+
+
+def _render_page(page, dpi, width=None, height=None, max_pixels=None):
+    """按DPI或目标尺寸将页面渲染为RGB像素图"""
+    fitz = _import_fitz()
+    
+    # 按页面尺寸计算缩放因子，避免渲染多余像素
+    zoom = page_zoom(page.rect, dpi, width, height, max_pixels)
+    mat = fitz.Matrix(zoom, zoom)
+    return page.get_pixmap(matrix=mat, alpha=False)
+
+
+def _pixmap_size(page, dpi, width=None, height=None, max_pixels=None):
+    """不渲染页面，计算 _render_page 输出的像素图尺寸 (宽, 高)"""
+    fitz = _import_fitz()
+    
+    zoom = page_zoom(page.rect, dpi, width, height, max_pixels)
+    rect = (page.rect * fitz.Matrix(zoom, zoom)).irect
+    return rect.width, rect.height
+
+
+class _PixmapArray:
+    """通过数组接口暴露像素图的采样数据，并保持像素图存活，供NumPy零拷贝引用"""
+    
+    def __init__(self, pix):
+        self.pix = pix
+        self.__array_interface__ = {
+            "version": 3,
+            "shape": (pix.h, pix.w, pix.n),
+            "typestr": "|u1",
+            "data": (pix.samples_ptr, False),
+            "strides": (pix.stride, pix.n, 1),
+        }
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("数组输出需要安装NumPy: uv add numpy")
+    return numpy
+
+
+def pdf_to_arrays(
+    pdf_path: PdfSource,
+    dpi: int = 200,
+    page_range: Union[str, tuple, None] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None,
+    channels_first: bool = False,
+    normalize: bool = False,
+    stack: bool = False,
+    mmap_path: Optional[str] = None,
+    pool: Optional[DocumentPool] = None,
+    password: Optional[str] = None
+):
+    """
+    将PDF页面直接渲染为NumPy数组，跳过图片编码和解码
+
+    默认返回 HWC 布局的 uint8 数组，直接引用像素图的采样内存而不复制。
+
+    Args:
+        pdf_path: PDF文件路径，或 bytes / memoryview / mmap 内存数据
+        dpi: 图片分辨率，默认200
+        page_range: 页面选择表达式或 (开始页, 结束页) 元组
+        width: 目标宽度（像素）
+        height: 目标高度（像素）
+        max_pixels: 单页最大像素数
+        channels_first: 是否输出 CHW 布局
+        normalize: 是否转换为 [0, 1] 范围的 float32
+        stack: 是否将页面堆叠为一个连续数组 (N, ...)，要求所选页面的渲染尺寸相同
+        mmap_path: 堆叠结果写入的 .npy 内存映射文件路径（隐含 stack）
+        pool: 文档池，指定后复用已打开的文档（例: get_document_pool()）
+        password: 加密文档的密码
+
+    Returns:
+        数组列表；stack 或 mmap_path 时返回单个数组
+
+    Raises:
+        RuntimeError: 堆叠时页面尺寸不一致（渲染前检查，不会写出 mmap_path）或转换失败
+    """
+    np = _import_numpy()
+    
+    _check_source(pdf_path)
+    
+    stack = stack or mmap_path is not None
+    dtype = np.float32 if normalize else np.uint8
+    
+    def convert(pix, out=None):
+        array = np.asarray(_PixmapArray(pix))
+        if channels_first:
+            array = array.transpose(2, 0, 1)
+        if out is not None:
+            if out.shape != array.shape:
+                raise ValueError(f"页面尺寸不一致，无法堆叠: {array.shape} != {out.shape}")
+            if normalize:
+                np.multiply(array, 1 / 255.0, out=out, casting="unsafe")
+            else:
+                out[...] = array
+            return out
+        if normalize:
+            array = array.astype(np.float32) / 255.0
+        return array
+    
+    try:
+        with _open_document(pdf_path, pool, password) as pdf_document:
+            page_numbers = select_pages(page_range, len(pdf_document))
+            
+            if not stack:
+                arrays = [
+                    convert(_render_page(pdf_document[page_num], dpi, width, height, max_pixels))
+                    for page_num in page_numbers
+                ]
+            elif not page_numbers:
+                arrays = np.empty((0,), dtype=dtype)
+            else:
+                # 渲染前按页面尺寸检查能否堆叠，尺寸不一致时不渲染也不创建输出文件
+                sizes = {}
+                for page_num in page_numbers:
+                    size = _pixmap_size(pdf_document[page_num], dpi, width, height, max_pixels)
+                    sizes.setdefault(size, page_num)
+                if len(sizes) > 1:
+                    (size_a, page_a), (size_b, page_b) = list(sizes.items())[:2]
+                    raise ValueError(
+                        f"页面尺寸不一致，无法堆叠: 第 {page_a + 1} 页为 {size_a[0]}x{size_a[1]}，"
+                        f"第 {page_b + 1} 页为 {size_b[0]}x{size_b[1]}"
+                    )
+                (page_width, page_height), = sizes
+                shape = (3, page_height, page_width) if channels_first else (page_height, page_width, 3)
+                shape = (len(page_numbers),) + shape
+                if mmap_path:
+                    result = np.lib.format.open_memmap(mmap_path, mode="w+", dtype=dtype, shape=shape)
+                else:
+                    result = np.empty(shape, dtype=dtype)
+                try:
+                    for index, page_num in enumerate(page_numbers):
+                        convert(_render_page(pdf_document[page_num], dpi, width, height, max_pixels), result[index])
+                except BaseException:
+                    if mmap_path:
+                        del result
+                        os.remove(mmap_path)
+                    raise
+                if mmap_path:
+                    result.flush()
+                arrays = result
+    
+    except Exception as e:
+        raise RuntimeError(f"PDF转换失败: {str(e)}")
+    
+    return arrays
+
+
+class PostProcess:
+    """
+    编码前的图片后处理：自动裁剪白边、按宽高比补边、缩放
+
+    在渲染结果上直接处理，不需要额外的编码和解码，同时减少需要压缩的像素。
+    """
+    
+    FILTERS = ("nearest", "box", "bilinear", "hamming", "bicubic", "lanczos")
+    
+    def __init__(
+        self,
+        trim: bool = False,
+        trim_tolerance: int = 10,
+        trim_margin: int = 0,
+        aspect: Optional[float] = None,
+        pad_color: tuple = (255, 255, 255),
+        resize: Optional[tuple] = None,
+        resize_filter: str = "lanczos"
+    ):
+        """
+        Args:
+            trim: 是否自动裁剪白边（按非背景像素的边界框）
+            trim_tolerance: 背景判定容差，灰度不低于 255-trim_tolerance 的像素视为背景
+            trim_margin: 裁剪后保留的边距（像素）
+            aspect: 目标宽高比（宽/高），不足的方向以 pad_color 居中补边
+            pad_color: 补边颜色
+            resize: 缩放目标 (宽, 高)，其中一项为 None 时按比例计算
+            resize_filter: 缩放滤镜 (nearest, box, bilinear, hamming, bicubic, lanczos)
+        """
+        if resize_filter not in self.FILTERS:
+            raise ValueError(f"不支持的缩放滤镜: {resize_filter}")
+        self.trim = trim
+        self.trim_tolerance = trim_tolerance
+        self.trim_margin = trim_margin
+        self.aspect = aspect
+        self.pad_color = pad_color
+        self.resize = resize
+        self.resize_filter = resize_filter
+    
+    def apply(self, img):
+        """
+        处理图片
+
+        Returns:
+            (处理后的图片, 坐标变换 (sx, sy, tx, ty))，处理前的像素坐标 (x, y)
+            对应处理后的 (x*sx+tx, y*sy+ty)，用于换算输出DPI和文字坐标
+        """
+        from PIL import Image
+        
+        tx = ty = 0
+        
+        if self.trim:
+            # 查找表映射为二值掩码，getbbox 在C中计算非背景区域
+            level = 255 - self.trim_tolerance
+            mask = img.convert("L").point([255 if v < level else 0 for v in range(256)])
+            bbox = mask.getbbox()
+            if bbox:
+                margin = self.trim_margin
+                left = max(0, bbox[0] - margin)
+                top = max(0, bbox[1] - margin)
+                img = img.crop((
+                    left,
+                    top,
+                    min(img.width, bbox[2] + margin),
+                    min(img.height, bbox[3] + margin)
+                ))
+                tx, ty = -left, -top
+        
+        if self.aspect:
+            width, height = img.size
+            if width / height < self.aspect:
+                width = round(height * self.aspect)
+            else:
+                height = round(width / self.aspect)
+            if (width, height) != img.size:
+                canvas = Image.new(img.mode, (width, height), self.pad_color)
+                offset = ((width - img.width) // 2, (height - img.height) // 2)
+                canvas.paste(img, offset)
+                img = canvas
+                tx += offset[0]
+                ty += offset[1]
+        
+        sx = sy = 1.0
+        if self.resize:
+            target_width, target_height = self.resize
+            if target_width and target_height:
+                size = (target_width, target_height)
+            elif target_width:
+                size = (target_width, max(1, round(img.height * target_width / img.width)))
+            else:
+                size = (max(1, round(img.width * target_height / img.height)), target_height)
+            if size != img.size:
+                sx = size[0] / img.width
+                sy = size[1] / img.height
+                img = img.resize(size, Image.Resampling[self.resize_filter.upper()])
+        
+        return img, (sx, sy, tx * sx, ty * sy)
+
+
+class OutputSpec:
+    """
+    输出规格：格式 + DPI + 编码参数
+
+    同一次转换可指定多个规格，每页对每个不同的DPI只渲染一次，再分别编码为各个格式。
+    每个规格输出到输出目录下以 name 命名的子目录（默认为 "格式_DPI"，如 png_300）。
+    """
+    
+    def __init__(
+        self,
+        output_format: str = "PNG",
+        dpi: Optional[int] = None,
+        options: Optional[dict] = None,
+        name: Optional[str] = None
+    ):
+        """
+        Args:
+            output_format: 输出格式 (PNG, JPEG, WEBP, TIFF等)
+            dpi: 图片分辨率，默认使用转换的 dpi 参数
+            options: 传给 PIL Image.save 的编码参数（如 quality、optimize、compress_level）
+            name: 输出子目录名
+        """
+        self.output_format = output_format.upper()
+        self.dpi = dpi
+        self.options = dict(options or {})
+        self.name = name
+    
+    def resolve(self, dpi: int) -> "OutputSpec":
+        """填充默认DPI和子目录名"""
+        spec_dpi = self.dpi or dpi
+        return OutputSpec(self.output_format, spec_dpi, self.options,
+                          self.name or f"{self.output_format.lower()}_{spec_dpi}")
+    
+    def __repr__(self):
+        return f"OutputSpec({self.output_format!r}, {self.dpi!r}, {self.options!r}, {self.name!r})"
+
+
+def parse_output_spec(spec: str) -> OutputSpec:
+    """
+    解析输出规格表达式: 格式[@DPI][:参数=值,...]
+
+    例: "PNG@300"、"JPEG@150:quality=85,optimize"、"WEBP:quality=80,method=6"。
+    只写参数名表示 True，数字参数自动转换为整数或浮点数。
+
+    Raises:
+        ValueError: 表达式格式不正确
+    """
+    head, _, option_text = spec.partition(":")
+    output_format, _, dpi_text = head.partition("@")
+    if not output_format.strip():
+        raise ValueError(f"输出规格缺少格式: '{spec}'")
+    dpi = None
+    if dpi_text:
+        try:
+            dpi = int(dpi_text)
+        except ValueError:
+            raise ValueError(f"输出规格的DPI无效: '{spec}'")
+    options = {}
+    for item in filter(None, (part.strip() for part in option_text.split(","))):
+        key, has_value, value = item.partition("=")
+        if not has_value:
+            options[key] = True
+            continue
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        options[key] = value
+    return OutputSpec(output_format.strip(), dpi, options)
+
+
+def _output_path(output_dir, pdf_name, page_num, output_format):
+    """生成页面输出文件路径（page_num 从0开始）"""
+    output_filename = f"{pdf_name}_page_{page_num + 1:03d}.{output_format.lower()}"
+    return os.path.join(output_dir, output_filename)
+
+
+def _emit(event_callback, event, **fields):
+    """发送结构化进度事件"""
+    if event_callback is None and _profile_session is None:
+        return
+    record = {"event": event, "time": round(time.time(), 3), **fields}
+    if _profile_session is not None and event == "page":
+        _profile_session.pages.append(record)
+    if event_callback is not None:
+        event_callback(record)
+
+
+def _record_profile_pages(events):
+    """把工作进程中发出的 page 事件计入正在进行的性能分析"""
+    if _profile_session is not None:
+        _profile_session.pages.extend(event for event in events if event["event"] == "page")
+
+
+class BatchReport:
+    """
+    汇总进度事件，生成机器可读的批处理报告
+
+    作为 event_callback 使用，可通过 forward 将事件同时转发给其他回调。
+    """
+    
+    def __init__(self, forward: Optional[callable] = None):
+        self.forward = forward
+        self.documents = OrderedDict()
+        self.started = time.perf_counter()
+    
+    def __call__(self, event):
+        document = self.documents.setdefault(event["document"], {
+            "document": event["document"],
+            "status": "pending",
+            "pages_ok": 0,
+            "pages_failed": 0,
+            "pages_blank": 0,
+            "pages_duplicate": 0,
+            "bytes": 0,
+            "seconds": 0.0,
+            "errors": [],
+        })
+        kind = event["event"]
+        if kind == "page":
+            status = event["status"]
+            if status == "ok":
+                document["pages_ok"] += 1
+                document["bytes"] += event["bytes"]
+            elif status == "error":
+                document["pages_failed"] += 1
+                document["errors"].append({"page": event["page"], **event["error"]})
+            elif status == "blank":
+                document["pages_blank"] += 1
+            elif status == "duplicate":
+                document["pages_duplicate"] += 1
+        elif kind == "document_end":
+            document["status"] = event["status"]
+            document["seconds"] = event["seconds"]
+        elif kind == "document_error":
+            document["status"] = "failed"
+            document["errors"].append({"page": None, **event["error"]})
+        if self.forward is not None:
+            self.forward(event)
+    
+    @property
+    def failed(self) -> bool:
+        """是否有文档或页面转换失败"""
+        return any(doc["status"] != "ok" for doc in self.documents.values())
+    
+    def to_dict(self) -> dict:
+        documents = list(self.documents.values())
+        pages_ok = sum(doc["pages_ok"] for doc in documents)
+        seconds = time.perf_counter() - self.started
+        return {
+            "status": "failed" if self.failed else "ok",
+            "documents": documents,
+            "totals": {
+                "documents": len(documents),
+                "documents_failed": sum(doc["status"] == "failed" for doc in documents),
+                "pages_ok": pages_ok,
+                "pages_failed": sum(doc["pages_failed"] for doc in documents),
+                "pages_blank": sum(doc["pages_blank"] for doc in documents),
+                "pages_duplicate": sum(doc["pages_duplicate"] for doc in documents),
+                "bytes": sum(doc["bytes"] for doc in documents),
+                "seconds": round(seconds, 4),
+                "pages_per_second": round(pages_ok / seconds, 3) if seconds > 0 else None,
+            },
+        }
+
+
+def _write_layouts(layouts, output_dir, pdf_name, text_export):
+    """按页码顺序写出文字布局：json 为每页一个文件，jsonl 为每个文档一个文件"""
+    if text_export == "json":
+        for page_num, layout in layouts.items():
+            with open(_output_path(output_dir, pdf_name, page_num, "json"), "w", encoding="utf-8") as f:
+                json.dump(layout, f, ensure_ascii=False)
+    else:
+        with open(os.path.join(output_dir, f"{pdf_name}_text.jsonl"), "w", encoding="utf-8") as f:
+            for page_num in sorted(layouts):
+                f.write(json.dumps(layouts[page_num], ensure_ascii=False) + "\n")
+
+
+def _split_duplicates(pdf_document, page_numbers, dedup):
+    """
+    按页面指纹拆分出需要渲染的页面和重复页面
+
+    Returns:
+        (需要渲染的页面, [(重复页面, 指纹)], {需要渲染的页面: 指纹})
+    """
+    memo = {}
+    unique = []
+    duplicates = []
+    fingerprints = {}
+    seen = set(dedup.rendered)
+    for page_num in page_numbers:
+        fingerprint = page_fingerprint(pdf_document, pdf_document[page_num], memo)
+        if fingerprint in seen:
+            duplicates.append((page_num, fingerprint))
+        else:
+            seen.add(fingerprint)
+            unique.append(page_num)
+            fingerprints[page_num] = fingerprint
+    return unique, duplicates, fingerprints
+
+
+def _page_layout(page, matrix, transform, image_path):
+    """
+    提取页面文字、单词边界框和链接，坐标换算为输出图片的像素坐标
+    """
+    fitz = _import_fitz()
+    
+    sx, sy, tx, ty = transform
+    
+    def box(rect):
+        # 文字和链接坐标基于未旋转的页面，先应用页面旋转再缩放到像素坐标
+        rect = fitz.Rect(rect) * matrix
+        return [
+            round(rect.x0 * sx + tx, 2),
+            round(rect.y0 * sy + ty, 2),
+            round(rect.x1 * sx + tx, 2),
+            round(rect.y1 * sy + ty, 2),
+        ]
+    
+    # 文字和单词共用一次文本提取
+    textpage = page.get_textpage()
+    words = [
+        {"text": word[4], "bbox": box(word[:4]), "block": word[5], "line": word[6]}
+        for word in page.get_text("words", textpage=textpage)
+    ]
+    links = []
+    for link in page.get_links():
+        item = {"bbox": box(link["from"])}
+        if link.get("uri"):
+            item["uri"] = link["uri"]
+        elif link.get("page", -1) >= 0:
+            item["page"] = link["page"] + 1
+        links.append(item)
+    
+    return {
+        "page": page.number + 1,
+        "image": os.path.basename(image_path),
+        "text": page.get_text("text", textpage=textpage),
+        "words": words,
+        "links": links,
+    }
+
+
+def _convert_page(
+    pdf_document,
+    page_num,
+    pdf_name,
+    output_dir,
+    output_format,
+    dpi,
+    width=None,
+    height=None,
+    max_pixels=None,
+    auto_dpi=False,
+    postprocess=None,
+    text_export=None,
+    outputs=None
+):
+    """
+    渲染并保存单个页面，返回 (输出路径列表, 实际DPI, 文字布局)
+
+    指定 outputs 时按缩放比例分组，每组只渲染一次并依次编码为组内各个规格；
+    实际DPI和文字布局以第一个规格为准。
+    """
+    fitz = _import_fitz()
+    from PIL import Image
+    
+    page = pdf_document[page_num]
+    if outputs is None:
+        outputs = [OutputSpec(output_format, dpi, name="")]
+    
+    # 按实际缩放比例分组，目标尺寸相同的规格共用一次渲染
+    groups = OrderedDict()
+    for spec in outputs:
+        page_dpi = page_auto_dpi(page, spec.dpi) if auto_dpi and not (width or height) else spec.dpi
+        zoom = page_zoom(page.rect, page_dpi, width, height, max_pixels)
+        groups.setdefault(zoom, (page_dpi, []))[1].append(spec)
+    
+    output_paths = {}
+    first_dpi = None
+    layout = None
+    for zoom, (page_dpi, specs) in groups.items():
+        # 渲染页面为图片
+        pix = _render_page(page, page_dpi, width, height, max_pixels)
+        # 实际DPI（指定目标尺寸或像素上限时与设置值不同），写入图片元数据
+        actual_dpi = round(pix.width * 72.0 / max(page.rect.width, 1))
+        
+        # 直接基于像素图数据构建PIL Image，无需PPM编码和解码
+        pil_img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1)
+        
+        # 编码前的后处理（裁边、补边、缩放）
+        transform = (1.0, 1.0, 0, 0)
+        if postprocess is not None:
+            pil_img, transform = postprocess.apply(pil_img)
+            actual_dpi = round(actual_dpi * transform[0])
+        
+        for spec in specs:
+            # 生成输出文件名并保存图片
+            spec_dir = os.path.join(output_dir, spec.name) if spec.name else output_dir
+            output_path = _output_path(spec_dir, pdf_name, page_num, spec.output_format)
+            if os.path.lexists(output_path):
+                # 已有文件可能是去重生成的硬链接或符号链接，原地写入会改动共享的文件
+                os.remove(output_path)
+            pil_img.save(output_path, spec.output_format, dpi=(actual_dpi, actual_dpi), **spec.options)
+            output_paths[spec.name] = output_path
+            
+            # 复用已加载的页面对象导出文字层
+            if spec is outputs[0]:
+                first_dpi = actual_dpi
+                if text_export:
+                    matrix = page.rotation_matrix * fitz.Matrix(zoom, zoom)
+                    layout = _page_layout(page, matrix, transform, output_path)
+                    layout["width"], layout["height"] = pil_img.size
+    
+    return [output_paths[spec.name] for spec in outputs], first_dpi, layout
+
+
+def _try_convert_page(pdf_document, page_num, settings):
+    """
+    转换单个页面，返回结果字典：
+    page_num（从0开始）、output、outputs（多输出规格时的全部路径）、dpi、layout、
+    error（成功时为 None）、seconds（耗时）
+    """
+    profiler = _worker_profiler()
+    if profiler is not None:
+        profiler.start()
+    start = time.perf_counter()
+    result = {"page_num": page_num, "output": None, "outputs": [], "dpi": None, "layout": None, "error": None}
+    try:
+        result["outputs"], result["dpi"], result["layout"] = _convert_page(pdf_document, page_num, **settings)
+        result["output"] = result["outputs"][0]
+    except Exception as e:
+        result["error"] = str(e)
+        result["error_type"] = type(e).__name__
+    result["seconds"] = time.perf_counter() - start
+    if profiler is not None:
+        profiler.stop()
+    return result
+
+
+def estimate_page_pixels(
+    page_rect,
+    dpi: int = 200,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> int:
+    """
+    渲染前估算单页输出的像素数（宽×高），参数同 estimate_page_bytes
+    """
+    zoom = page_zoom(page_rect, dpi, width, height, max_pixels)
+    return math.ceil(page_rect.width * zoom) * math.ceil(page_rect.height * zoom)
+
+
+def estimate_page_bytes(
+    page_rect,
+    dpi: int = 200,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> int:
+    """
+    渲染前估算单页转换的峰值内存
+
+    按RGB像素图计算，转换过程中同时存在像素图、PIL图片和后处理中间结果约3份像素数据。
+
+    Args:
+        page_rect: 页面矩形 (page.rect)
+        dpi: 图片分辨率
+        width: 目标宽度（像素）
+        height: 目标高度（像素）
+        max_pixels: 单页最大像素数
+
+    Returns:
+        估算字节数
+    """
+    return estimate_page_pixels(page_rect, dpi, width, height, max_pixels) * 3 * 3
+
+
+def available_memory() -> Optional[int]:
+    """返回可用内存字节数，考虑容器 (cgroup) 内存限制；无法获取时返回 None"""
+    limits = []
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            limits.append(int(value))
+        break
+    try:
+        limits.append(os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE"))
+    except (AttributeError, ValueError, OSError):
+        pass
+    return min(limits) if limits else None
+
+
+def _default_memory_budget() -> int:
+    memory = available_memory()
+    return memory // 2 if memory else 1024 * 1024 * 1024
+
+
+_worker_document = None
+
+
+def _init_worker(source, password=None):
+    """并行转换进程初始化：每个进程打开一次文档"""
+    global _worker_document
+    if not _is_memory_source(source):
+        # 各进程映射同一文件，共享系统页缓存，不会重复读取
+        source = map_pdf(source)
+    _worker_document = open_pdf(source, password)
+
+
+def _worker_source(source, context):
+    """
+    传给工作进程的文档来源
+
+    fork 启动的进程直接继承内存输入，与父进程共享同一只读映射；其他启动方式需要序列化参数，
+    map_pdf 的映射改传文件路径由各进程自行映射，其余内存输入只能复制为 bytes。
+    """
+    if not isinstance(source, (mmap.mmap, memoryview, bytearray)) or context.get_start_method() == "fork":
+        return source
+    if getattr(source, "path", None):
+        return source.path
+    return bytes(source)
+
+
+def _convert_page_worker(page_num, settings):
+    return _try_convert_page(_worker_document, page_num, settings)
+
+
+def _convert_pages_parallel(source, pdf_document, page_numbers, settings, workers, memory_budget=None,
+                            password=None):
+    """
+    多进程转换页面，按完成顺序逐个返回结果
+
+    渲染前按页面尺寸估算每页内存，只有在途任务的估算内存不超过预算时才提交新页面，
+    因此大页面自动降低并发，小页面使用全部进程。超出预算的单个页面在空闲时单独执行。
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    
+    if memory_budget is None:
+        memory_budget = _default_memory_budget()
+    
+    # 多个输出规格依次渲染，按最大DPI估算
+    estimate_dpi = max(spec.dpi for spec in settings["outputs"]) if settings["outputs"] else settings["dpi"]
+    estimates = {
+        page_num: estimate_page_bytes(
+            pdf_document[page_num].rect,
+            estimate_dpi,
+            settings["width"],
+            settings["height"],
+            settings["max_pixels"]
+        )
+        for page_num in page_numbers
+    }
+    
+    context = multiprocessing.get_context()
+    source = _worker_source(source, context)
+    pending = deque(page_numbers)
+    running = {}
+    in_flight = 0
+    
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(page_numbers)),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(source, password)
+    ) as executor:
+        while pending or running:
+            # 按内存预算提交任务
+            while pending and len(running) < workers:
+                need = estimates[pending[0]]
+                if running and in_flight + need > memory_budget:
+                    break
+                page_num = pending.popleft()
+                running[executor.submit(_convert_page_worker, page_num, settings)] = page_num
+                in_flight += need
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_num = running.pop(future)
+                in_flight -= estimates[page_num]
+                yield future.result()
+
+
+def _isolated_worker(connection, source, password):
+    """隔离转换进程：打开文档后循环接收页码并返回转换结果，ink_threshold 不为 None 时先检测空白页"""
+    _init_worker(source, password)
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        page_num, settings, ink_threshold = task
+        if ink_threshold is not None:
+            start = time.perf_counter()
+            if is_blank_page(_worker_document[page_num], ink_threshold):
+                connection.send({"page_num": page_num, "blank": True, "seconds": time.perf_counter() - start})
+                continue
+        connection.send(_convert_page_worker(page_num, settings))
+
+
+def _timeout_result(page_num, seconds, message, error_type="TimeoutError"):
+    return {"page_num": page_num, "output": None, "outputs": [], "dpi": None, "layout": None,
+            "error": message, "error_type": error_type, "seconds": seconds}
+
+
+def _convert_pages_isolated(source, page_numbers, settings, workers, page_timeout=None,
+                            document_timeout=None, password=None, ink_threshold=None):
+    """
+    在可终止的工作进程中转换页面，按完成顺序逐个返回结果
+
+    单页超过 page_timeout 秒时终止该进程并记为失败，换新进程继续其余页面；
+    进程崩溃同样只影响当前页面。整个文档超过 document_timeout 秒时终止全部进程并抛出 TimeoutError。
+    指定 ink_threshold 时空白页检测也在工作进程中执行并受超时限制，空白页返回 {"page_num", "blank": True}。
+    """
+    from multiprocessing.connection import wait
+    
+    context = multiprocessing.get_context()
+    source = _worker_source(source, context)
+    deadline = time.monotonic() + document_timeout if document_timeout else None
+    pending = deque(page_numbers)
+    idle = []
+    busy = {}  # connection -> (process, page_num, started)
+    
+    def spawn():
+        parent, child = context.Pipe()
+        process = context.Process(target=_isolated_worker, args=(child, source, password), daemon=True)
+        process.start()
+        child.close()
+        return process, parent
+    
+    def kill(process, connection):
+        process.kill()
+        process.join()
+        connection.close()
+    
+    try:
+        while pending or busy:
+            while pending and len(busy) < workers:
+                process, connection = idle.pop() if idle else spawn()
+                page_num = pending.popleft()
+                connection.send((page_num, settings, ink_threshold))
+                busy[connection] = (process, page_num, time.monotonic())
+            
+            now = time.monotonic()
+            limits = [started + page_timeout for _, _, started in busy.values()] if page_timeout else []
+            if deadline:
+                limits.append(deadline)
+            timeout = max(0.0, min(limits) - now) if limits else None
+            
+            for connection in wait(list(busy), timeout):
+                process, page_num, started = busy.pop(connection)
+                try:
+                    result = connection.recv()
+                except (EOFError, OSError):
+                    kill(process, connection)
+                    yield _timeout_result(page_num, time.monotonic() - started,
+                                          f"转换进程异常退出 (退出码 {process.exitcode})", "WorkerCrashed")
+                    continue
+                idle.append((process, connection))
+                yield result
+            
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                raise TimeoutError("文档转换超时")
+            if page_timeout:
+                for connection, (process, page_num, started) in list(busy.items()):
+                    if now - started >= page_timeout:
+                        del busy[connection]
+                        kill(process, connection)
+                        yield _timeout_result(page_num, now - started, f"页面转换超时 ({page_timeout} 秒)")
+    finally:
+        for connection, (process, _, _) in busy.items():
+            kill(process, connection)
+        for process, connection in idle:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+            connection.close()
 
 
 def pdf_to_images(
-    pdf_path: str,
+    pdf_path: PdfSource,
     output_dir: Optional[str] = None,
     output_format: str = "PNG",
     dpi: int = 200,
-    page_range: Optional[tuple] = None,
-    log_callback: Optional[callable] = None
+    page_range: Union[str, tuple, None] = None,
+    log_callback: Optional[callable] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None,
+    name: Optional[str] = None,
+    pool: Optional[DocumentPool] = None,
+    auto_dpi: bool = False,
+    workers: int = 1,
+    memory_budget: Optional[int] = None,
+    dedup: Optional[PageDeduplicator] = None,
+    skip_blank: bool = False,
+    ink_threshold: float = 0.002,
+    skipped: Optional[list] = None,
+    postprocess: Optional[PostProcess] = None,
+    text_export: Optional[str] = None,
+    event_callback: Optional[callable] = None,
+    shard: Optional[tuple] = None,
+    password: Optional[str] = None,
+    page_timeout: Optional[float] = None,
+    document_timeout: Optional[float] = None,
+    quarantine: Optional[list] = None,
+    outputs: Optional[List[OutputSpec]] = None
 ) -> List[str]:
     """
     将PDF文件转换为图片
     
     Args:
-        pdf_path: PDF文件路径
-        output_dir: 输出目录，默认为PDF文件同目录
+        pdf_path: PDF文件路径，或 bytes / memoryview / mmap 内存数据
+        output_dir: 输出目录，默认为PDF文件同目录（内存输入时必须指定）
         output_format: 输出格式 (PNG, JPEG, TIFF等)
         dpi: 图片分辨率，默认200
-        page_range: 页面范围 (开始页, 结束页)，从1开始计数
+        page_range: 页面选择表达式 (例: "1,3,5-9,-2,odd") 或 (开始页, 结束页) 元组，从1开始计数
         log_callback: 日志回调函数，用于GUI显示
+        width: 目标宽度（像素），指定后按页面尺寸计算缩放，忽略DPI
+        height: 目标高度（像素），与width同时指定时等比缩放至不超过该尺寸
+        max_pixels: 单页最大像素数，超出时缩小渲染
+        name: 输出文件名前缀，默认为PDF文件名（内存输入时默认为 "document"）
+        pool: 文档池，指定后复用已打开的文档（例: get_document_pool()）
+        auto_dpi: 按页面内容自动选择DPI，dpi 作为上限
+        workers: 最大并行进程数，1为串行，0为CPU核心数
+        memory_budget: 并行转换的内存预算（字节），默认为可用内存的一半
+        dedup: 页面去重索引，内容相同的页面只渲染一次（可跨多次调用共享）
+        skip_blank: 跳过空白页
+        ink_threshold: 空白页判定的墨迹像素比例阈值
+        skipped: 传入列表时，追加被跳过的空白页 (文件名, 页码)
+        postprocess: 编码前的后处理（裁边、补边、缩放）
+        text_export: 同时导出文字层: "json"（每页一个文件）或 "jsonl"（每个文档一个文件），
+            包含页面文字、按输出像素坐标的单词边界框和链接
+        event_callback: 结构化进度事件回调，参数为事件字典，"event" 字段为
+            document_start / page / document_end / document_error，
+            page 事件的 status 为 ok / error / blank / duplicate
+        shard: (分片序号, 分片总数)，只转换按 文档路径+页码 哈希属于该分片的页面
+        password: 加密文档的密码
+        page_timeout: 单页转换超时（秒），超时页面记为失败，其余页面继续
+        document_timeout: 整个文档的转换超时（秒）
+            指定任一超时后，空白页检测和页面渲染在可终止的独立进程中执行（进程数为 workers），
+            不能与 dedup 同时使用
+        quarantine: 传入列表时，追加无法处理的文档 {"document", "reason", "error", "pages"}，
+            reason 为 encrypted / damaged / timeout / page_timeout
+        outputs: 多个输出规格（OutputSpec），指定后忽略 output_format，每个规格输出到
+            输出目录下的子目录；每页对每个不同的DPI只渲染一次。不能与 dedup 同时使用
     
     Returns:
         生成的图片文件路径列表
     """
-    if not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+    if text_export not in (None, "json", "jsonl"):
+        raise ValueError(f"不支持的文字层格式: {text_export}")
+    
+    if outputs:
+        outputs = [spec.resolve(dpi) for spec in outputs]
+        names = [spec.name for spec in outputs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"输出规格的子目录名重复: {', '.join(names)}")
+        if dedup is not None:
+            raise ValueError("去重不支持多个输出规格")
+    else:
+        outputs = None
+    
+    if dedup is not None and (page_timeout or document_timeout):
+        # 页面指纹在调用进程中计算，不受超时限制
+        raise ValueError("去重不能与 page_timeout / document_timeout 同时使用")
+    
+    try:
+        _check_source(pdf_path)
+    except FileNotFoundError as e:
+        _emit(event_callback, "document_error", document=os.fspath(pdf_path),
+              error={"type": "FileNotFoundError", "message": str(e)})
+        raise
     
     if output_dir is None:
+        if _is_memory_source(pdf_path):
+            raise ValueError("内存输入必须指定输出目录")
         output_dir = os.path.dirname(pdf_path)
     
     os.makedirs(output_dir, exist_ok=True)
+    for spec in outputs or ():
+        os.makedirs(os.path.join(output_dir, spec.name), exist_ok=True)
     
-    pdf_name = Path(pdf_path).stem
+    if name:
+        pdf_name = name
+    elif _is_memory_source(pdf_path):
+        pdf_name = "document"
+    else:
+        pdf_name = Path(pdf_path).stem
+    
+    # 单页转换参数，串行和并行转换共用
+    settings = dict(
+        pdf_name=pdf_name,
+        output_dir=output_dir,
+        output_format=output_format,
+        dpi=dpi,
+        width=width,
+        height=height,
+        max_pixels=max_pixels,
+        auto_dpi=auto_dpi,
+        postprocess=postprocess,
+        text_export=text_export,
+        outputs=outputs
+    )
+    
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    
+    document = pdf_path if isinstance(pdf_path, (str, os.PathLike)) else pdf_name
+    document = os.fspath(document)
+    started = time.perf_counter()
+    
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            print(message)
     
     try:
         # 打开PDF文档
-        pdf_document = fitz.open(pdf_path)
-        
-        # 计算缩放因子
-        zoom = dpi / 72.0  # PyMuPDF使用72 DPI作为基准
-        mat = fitz.Matrix(zoom, zoom)
-        
-        # 确定页面范围
-        total_pages = len(pdf_document)
-        if page_range:
-            start_page = max(0, page_range[0] - 1)  # 转换为0索引
-            end_page = min(total_pages, page_range[1])
-        else:
-            start_page = 0
-            end_page = total_pages
-        
-        output_files = []
-        
-        for page_num in range(start_page, end_page):
-            try:
-                page = pdf_document[page_num]
-                
-                # 渲染页面为图片
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # 转换为PIL Image
-                img_data = pix.tobytes("ppm")
-                pil_img = Image.open(io.BytesIO(img_data))
-                
-                # 生成输出文件名
-                actual_page_num = page_num + 1
-                output_filename = f"{pdf_name}_page_{actual_page_num:03d}.{output_format.lower()}"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # 保存图片
-                pil_img.save(output_path, output_format)
-                output_files.append(output_path)
-                
-                message = f"已保存: {output_path}"
-                if log_callback:
-                    log_callback(message)
-                else:
-                    print(message)
-                    
-            except Exception as e:
-                error_message = f"保存页面 {page_num + 1} 失败: {str(e)}"
-                if log_callback:
-                    log_callback(error_message)
+        with _open_document(pdf_path, pool, password) as pdf_document:
+            
+            # 确定页面范围，只加载和渲染选中的页面
+            page_numbers = select_pages(page_range, len(pdf_document))
+            if shard is not None:
+                shard_index, shard_count = shard
+                page_numbers = [
+                    n for n in page_numbers if shard_of(document, n + 1, shard_count) == shard_index
+                ]
+            _emit(event_callback, "document_start", document=document,
+                  page_count=len(pdf_document), selected=len(page_numbers))
+            
+            isolated = bool(page_timeout or document_timeout)
+            
+            def skip_blank_pages(blank_pages):
+                if skipped is not None:
+                    skipped.extend((pdf_name, n + 1) for n in blank_pages)
+                for n in blank_pages:
+                    _emit(event_callback, "page", document=document, page=n + 1, status="blank")
+                log(f"跳过空白页: {', '.join(str(n + 1) for n in blank_pages)}")
+            
+            # 跳过空白页，在渲染前完成检测；指定超时时在隔离进程中逐页检测，同样受超时限制
+            if skip_blank and not isolated:
+                blank_pages = [n for n in page_numbers if is_blank_page(pdf_document[n], ink_threshold)]
+                if blank_pages:
+                    blank_set = set(blank_pages)
+                    page_numbers = [n for n in page_numbers if n not in blank_set]
+                    skip_blank_pages(blank_pages)
+            
+            # 去重模式下，与已渲染页面相同的页面不再渲染
+            fingerprints = {}
+            duplicates = []
+            if dedup is not None:
+                page_numbers, duplicates, fingerprints = _split_duplicates(
+                    pdf_document, page_numbers, dedup
+                )
+            
+            def convert(numbers):
+                if isolated:
+                    remaining = None
+                    if document_timeout:
+                        remaining = document_timeout - (time.perf_counter() - started)
+                        if remaining <= 0:
+                            raise TimeoutError("文档转换超时")
+                    return _convert_pages_isolated(
+                        pdf_path, numbers, settings, workers, page_timeout, remaining, password,
+                        ink_threshold if skip_blank else None
+                    )
+                if workers > 1 and len(numbers) > 1:
+                    return _convert_pages_parallel(
+                        pdf_path, pdf_document, numbers, settings, workers, memory_budget, password
+                    )
+                return (_try_convert_page(pdf_document, page_num, settings) for page_num in numbers)
+            
+            results = convert(page_numbers) if page_numbers else ()
+            
+            saved = []
+            layouts = {}
+            failed = 0
+            timed_out = []
+            isolated_blank = []
+            total_bytes = 0
+            
+            def handle(result):
+                nonlocal failed, total_bytes
+                if result.get("blank"):
+                    isolated_blank.append(result["page_num"])
+                    return
+                page_num, output_path, layout = result["page_num"], result["output"], result["layout"]
+                if result["error"] is None:
+                    saved.extend((page_num, path) for path in result["outputs"])
+                    if layout is not None:
+                        layouts[page_num] = layout
+                    if page_num in fingerprints:
+                        dedup.rendered.setdefault(fingerprints[page_num], output_path)
+                        if layout is not None:
+                            dedup.layouts.setdefault(fingerprints[page_num], layout)
+                    output_bytes = sum(os.path.getsize(path) for path in result["outputs"])
+                    total_bytes += output_bytes
+                    extra = {"outputs": result["outputs"]} if outputs else {}
+                    _emit(event_callback, "page", document=document, page=page_num + 1, status="ok",
+                          output=output_path, bytes=output_bytes, dpi=result["dpi"],
+                          seconds=round(result["seconds"], 4), **extra)
+                    message = f"已保存: {', '.join(result['outputs'])}"
+                    if auto_dpi:
+                        message += f" ({result['dpi']} DPI)"
                 else:
-                    print(error_message)
-        
-        pdf_document.close()
+                    failed += 1
+                    if result.get("error_type") in ("TimeoutError", "WorkerCrashed"):
+                        timed_out.append(page_num + 1)
+                    _emit(event_callback, "page", document=document, page=page_num + 1, status="error",
+                          error={"type": result.get("error_type"), "message": result["error"]},
+                          seconds=round(result["seconds"], 4))
+                    message = f"保存页面 {page_num + 1} 失败: {result['error']}"
+                log(message)
+            
+            for result in results:
+                handle(result)
+            if isolated_blank:
+                skip_blank_pages(sorted(isolated_blank))
+            
+            for page_num, fingerprint in duplicates:
+                if fingerprint not in dedup.rendered:
+                    # 原页面转换失败，单独转换该页面
+                    for result in convert([page_num]):
+                        handle(result)
+                    continue
+                output_path = _output_path(output_dir, pdf_name, page_num, output_format)
+                pixels = estimate_page_pixels(pdf_document[page_num].rect, dpi, width, height, max_pixels)
+                linked_path = dedup.link(fingerprint, output_path, pixels)
+                if linked_path:
+                    saved.append((page_num, linked_path))
+                if text_export and fingerprint in dedup.layouts:
+                    # 重复页面内容相同，复用原页面的文字布局
+                    layouts[page_num] = dict(
+                        dedup.layouts[fingerprint],
+                        page=page_num + 1,
+                        image=os.path.basename(output_path)
+                    )
+                _emit(event_callback, "page", document=document, page=page_num + 1, status="duplicate",
+                      output=linked_path, original=dedup.rendered[fingerprint])
+                log(f"重复页面: {output_path} -> {dedup.rendered[fingerprint]}")
+            
+            if text_export:
+                _write_layouts(layouts, output_dir, pdf_name, text_export)
+            
+            # 并行转换按完成顺序返回，按页码排序
+            output_files = [output_path for _, output_path in sorted(saved, key=lambda item: item[0])]
+            
+            _emit(event_callback, "document_end", document=document, status="partial" if failed else "ok",
+                  pages_ok=len({page_num for page_num, _ in saved}), pages_failed=failed, bytes=total_bytes,
+                  seconds=round(time.perf_counter() - started, 4))
+            if timed_out and quarantine is not None:
+                quarantine.append({"document": document, "reason": "page_timeout",
+                                   "error": f"{len(timed_out)} 个页面超时或导致进程崩溃", "pages": sorted(timed_out)})
         
     except Exception as e:
+        _emit(event_callback, "document_error", document=document,
+              error={"type": type(e).__name__, "message": str(e)},
+              seconds=round(time.perf_counter() - started, 4))
+        if quarantine is not None:
+            if isinstance(e, PermissionError):
+                reason = "encrypted"
+            elif isinstance(e, TimeoutError):
+                reason = "timeout"
+            else:
+                reason = "damaged"
+            quarantine.append({"document": document, "reason": reason, "error": str(e), "pages": []})
         raise RuntimeError(f"PDF转换失败: {str(e)}")
     
     return output_files
@@ -105,7 +1798,10 @@ def multi_pdf_to_images(
     output_dir: str,
     output_format: str = "PNG",
     dpi: int = 200,
-    log_callback: Optional[callable] = None
+    log_callback: Optional[callable] = None,
+    page_range: Union[str, tuple, None] = None,
+    event_callback: Optional[callable] = None,
+    **options
 ) -> List[str]:
     """
     批量将多个PDF文件转换为图片，为每个PDF文件创建单独的文件夹
@@ -116,6 +1812,10 @@ def multi_pdf_to_images(
         output_format: 输出格式 (PNG, JPEG, TIFF等)
         dpi: 图片分辨率，默认200
         log_callback: 日志回调函数，用于GUI显示
+        page_range: 页面选择表达式，分别应用于每个PDF文件，默认全部页面
+        event_callback: 结构化进度事件回调，参见 pdf_to_images
+        **options: 其他转换参数，原样传给 pdf_to_images（如 width、workers、dedup、
+            skip_blank、postprocess、text_export 等），dedup 和 skipped 在所有文件间共享
     
     Returns:
         生成的图片文件路径列表
@@ -125,6 +1825,8 @@ def multi_pdf_to_images(
     for pdf_path in pdf_paths:
         if not os.path.exists(pdf_path):
             error_msg = f"PDF文件不存在: {pdf_path}"
+            _emit(event_callback, "document_error", document=pdf_path,
+                  error={"type": "FileNotFoundError", "message": error_msg})
             if log_callback:
                 log_callback(error_msg)
             else:
@@ -147,8 +1849,10 @@ def multi_pdf_to_images(
                 pdf_output_dir,
                 output_format,
                 dpi,
-                None,  # 全部页面
-                log_callback
+                page_range,
+                log_callback,
+                event_callback=event_callback,
+                **options
             )
             all_output_files.extend(output_files)
             
@@ -167,13 +1871,636 @@ def multi_pdf_to_images(
     return all_output_files
 
 
+class ProgressiveConversion:
+    """
+    渐进式转换：先以低DPI渲染可见页面并立即返回，其余页面和高分辨率在后台线程补齐
+
+    由 progressive_pdf_to_images 创建。预览图片保存在输出目录的 preview 子目录，
+    正式图片保存在输出目录。后台渲染顺序：可见页面的正式图片 → 其余页面的预览 → 其余页面的正式图片。
+    """
+    
+    def __init__(self, pdf_path, output_dir, preview_dir, page_count, pages, preview_dpi, dpi, image_callback,
+                 log_callback, pool, options):
+        self.pdf_path = pdf_path
+        self.output_dir = output_dir
+        self.preview_dir = preview_dir
+        self.page_count = page_count
+        self.pages = pages
+        self.preview_dpi = preview_dpi
+        self.dpi = dpi
+        self.image_callback = image_callback
+        self.log_callback = log_callback
+        self.pool = pool
+        self.options = options
+        self.previews = {}
+        self.images = {}
+        self.errors = {}
+        self.first_image_seconds = None
+        self._tasks = deque()
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._thread = None
+        self._started = time.perf_counter()
+    
+    def _render(self, stage, page):
+        """渲染单页（页码从1开始），stage 为 preview 或 full"""
+        preview = stage == "preview"
+        events = []
+        pdf_to_images(
+            self.pdf_path,
+            self.preview_dir if preview else self.output_dir,
+            dpi=self.preview_dpi if preview else self.dpi,
+            page_range=str(page),
+            log_callback=self.log_callback or (lambda message: None),
+            pool=self.pool,
+            event_callback=events.append,
+            **self.options
+        )
+        for event in events:
+            if event["event"] != "page":
+                continue
+            if event["status"] == "error":
+                self.errors[(stage, page)] = event["error"]["message"]
+            elif event.get("output"):
+                (self.previews if preview else self.images)[page] = event["output"]
+                if self.first_image_seconds is None:
+                    self.first_image_seconds = time.perf_counter() - self._started
+                if self.image_callback:
+                    self.image_callback(page, stage, event["output"])
+    
+    def _schedule(self, visible):
+        """按可见页面重新排列待渲染任务"""
+        visible_set = set(visible)
+        others = [page for page in self.pages if page not in visible_set]
+        tasks = [("preview", page) for page in visible if page not in self.previews]
+        tasks += [("full", page) for page in visible]
+        tasks += [("preview", page) for page in others]
+        tasks += [("full", page) for page in others]
+        done = {("preview", page) for page in self.previews} | {("full", page) for page in self.images}
+        with self._lock:
+            self._tasks = deque(task for task in tasks if task not in done)
+    
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._cancelled or not self._tasks:
+                    return
+                stage, page = self._tasks.popleft()
+            if stage == "preview" and page in self.previews or stage == "full" and page in self.images:
+                continue
+            try:
+                self._render(stage, page)
+            except Exception as e:
+                self.errors[(stage, page)] = str(e)
+    
+    def start(self, visible):
+        """同步渲染可见页面的预览，然后启动后台线程"""
+        for page in visible:
+            self._render("preview", page)
+        self._schedule(visible)
+        self._thread = threading.Thread(target=self._run, name="progressive-render", daemon=True)
+        self._thread.start()
+        return self
+    
+    def set_visible(self, page_range: Union[str, tuple]):
+        """可见范围变化（如滚动）时调用，后台线程优先渲染新的可见页面"""
+        selected = set(self.pages)
+        visible = [n + 1 for n in select_pages(page_range, self.page_count) if n + 1 in selected]
+        self._schedule(visible)
+    
+    def cancel(self):
+        """停止后台渲染，正在渲染的页面会完成"""
+        with self._lock:
+            self._cancelled = True
+    
+    def done(self) -> bool:
+        return self._thread is None or not self._thread.is_alive()
+    
+    def wait(self, timeout: Optional[float] = None) -> List[str]:
+        """等待后台渲染结束，返回正式图片路径（按页码排序）"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                raise TimeoutError(f"渐进式转换未在 {timeout} 秒内完成")
+        return [self.images[page] for page in sorted(self.images)]
+
+
+def progressive_pdf_to_images(
+    pdf_path: PdfSource,
+    output_dir: Optional[str] = None,
+    dpi: int = 200,
+    page_range: Union[str, tuple, None] = None,
+    visible: Union[str, tuple, None] = "1",
+    preview_dpi: int = 72,
+    image_callback: Optional[callable] = None,
+    log_callback: Optional[callable] = None,
+    pool: Optional[DocumentPool] = None,
+    **options
+) -> ProgressiveConversion:
+    """
+    渐进式转换，适用于预览界面：可见页面的低DPI预览渲染完成后立即返回
+
+    Args:
+        pdf_path: PDF文件路径或内存中的PDF数据
+        output_dir: 输出目录，预览图片保存在其中的 preview 子目录
+        dpi: 正式图片的分辨率
+        page_range: 页面选择表达式，默认全部页面
+        visible: 首先显示的页面（页面选择表达式），默认第1页
+        preview_dpi: 预览图片的分辨率
+        image_callback: 每张图片完成时调用 (页码, "preview"/"full", 路径)，后台图片在后台线程中回调
+        log_callback: 日志回调函数
+        pool: 文档池，默认使用进程内共享的文档池，前后台只打开一次文档
+        **options: 其他转换参数，原样传给 pdf_to_images（如 output_format、width、postprocess）
+
+    Returns:
+        ProgressiveConversion，previews 已包含可见页面的预览图片
+    """
+    if output_dir is None:
+        if _is_memory_source(pdf_path):
+            raise ValueError("内存输入必须指定输出目录")
+        output_dir = os.path.dirname(pdf_path)
+    
+    with _open_document(pdf_path, pool or _document_pool) as pdf_document:
+        page_count = len(pdf_document)
+    pages = [n + 1 for n in select_pages(page_range, page_count)]
+    selected = set(pages)
+    visible_pages = [n + 1 for n in select_pages(visible, page_count) if n + 1 in selected] or pages[:1]
+    
+    conversion = ProgressiveConversion(
+        pdf_path, output_dir, os.path.join(output_dir, "preview"), page_count, pages, preview_dpi, dpi,
+        image_callback, log_callback, pool or _document_pool, options
+    )
+    return conversion.start(visible_pages)
+
+
+class _StreamingPdfWriter:
+    """
+    逐页写出只含图片的PDF，每页写完即可释放像素数据，内存占用与页数无关
+
+    图片数据以已压缩的流直接写入（DCTDecode / CCITTFaxDecode / FlateDecode），不再解码重压缩。
+    """
+    
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3  # 1: Catalog, 2: Pages
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    
+    def _object(self, object_id, body: bytes, stream: Optional[bytes] = None):
+        self.offsets[object_id] = self.file.tell()
+        self.file.write(f"{object_id} 0 obj\n".encode() + body)
+        if stream is not None:
+            self.file.write(b"\nstream\n" + stream + b"\nendstream")
+        self.file.write(b"\nendobj\n")
+    
+    def add_page(self, width: float, height: float, image: dict, data: bytes):
+        """
+        添加一页，图片铺满页面
+
+        Args:
+            width: 页面宽度（点）
+            height: 页面高度（点）
+            image: 图片字典的键值（Width、Height、ColorSpace、BitsPerComponent、Filter 等，值为PDF语法字符串）
+            data: 已压缩的图片数据
+        """
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+        entries = "".join(f" /{key} {value}" for key, value in image.items())
+        self._object(image_id, f"<< /Type /XObject /Subtype /Image{entries} /Length {len(data)} >>".encode(), data)
+        content = f"q {width:.4f} 0 0 {height:.4f} 0 0 cm /Im0 Do Q".encode()
+        self._object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        self._object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.4f} {height:.4f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+    
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.file.tell()
+        self.file.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode())
+        for object_id in range(1, self.next_id):
+            self.file.write(f"{self.offsets[object_id]:010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        self.file.close()
+    
+    def abort(self):
+        self.file.close()
+        os.remove(self.file.name)
+
+
+def _encode_pdf_image(page, dpi, compression, quality, threshold, max_pixels=None):
+    """渲染页面并压缩为PDF图片流，返回 (图片字典, 压缩数据)"""
+    import io
+    import zlib
+    from PIL import Image
+    
+    fitz = _import_fitz()
+    zoom = page_zoom(page.rect, dpi, max_pixels=max_pixels)
+    gray = compression == "g4"
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False,
+                          colorspace=fitz.csGRAY if gray else fitz.csRGB)
+    image = {"Width": pix.width, "Height": pix.height, "BitsPerComponent": 8,
+             "ColorSpace": "/DeviceGray" if gray else "/DeviceRGB"}
+    
+    if compression == "flate":
+        # 无损压缩，直接压缩像素图的采样数据
+        image["Filter"] = "/FlateDecode"
+        row = pix.width * pix.n
+        if pix.stride == row:
+            return image, zlib.compress(pix.samples_mv, 6)
+        return image, zlib.compress(b"".join(pix.samples_mv[y * pix.stride:y * pix.stride + row]
+                                             for y in range(pix.height)), 6)
+    
+    mode = "L" if gray else "RGB"
+    pil_img = Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1)
+    buffer = io.BytesIO()
+    if compression == "jpeg":
+        image["Filter"] = "/DCTDecode"
+        pil_img.save(buffer, "JPEG", quality=quality, optimize=True)
+        return image, buffer.getvalue()
+    
+    # 黑白二值页面使用CCITT G4压缩：按阈值二值化后以单条带TIFF编码，取出条带数据
+    bilevel = pil_img.point(lambda value: 255 if value >= threshold else 0).convert("1")
+    bilevel.save(buffer, "TIFF", compression="group4", tiffinfo={278: pix.height})
+    tiff = Image.open(io.BytesIO(buffer.getvalue()))
+    offset, length = tiff.tag_v2[273][0], tiff.tag_v2[279][0]
+    image.update({
+        "BitsPerComponent": 1,
+        "Filter": "/CCITTFaxDecode",
+        "DecodeParms": f"<< /K -1 /Columns {pix.width} /Rows {pix.height} /BlackIs1 true >>",
+    })
+    return image, buffer.getvalue()[offset:offset + length]
+
+
+PDF_COMPRESSIONS = ("jpeg", "g4", "flate")
+
+
+def pdf_to_raster_pdf(
+    pdf_path: PdfSource,
+    output_path: str,
+    dpi: int = 200,
+    page_range: Union[str, tuple, None] = None,
+    compression: str = "jpeg",
+    quality: int = 85,
+    threshold: int = 128,
+    max_pixels: Optional[int] = None,
+    log_callback: Optional[callable] = None,
+    pool: Optional[DocumentPool] = None,
+    password: Optional[str] = None,
+    event_callback: Optional[callable] = None
+) -> str:
+    """
+    将PDF栅格化为只含图片的PDF（扁平化），逐页渲染并直接写入，不生成中间图片文件
+
+    Args:
+        pdf_path: PDF文件路径或内存中的PDF数据
+        output_path: 输出PDF路径
+        dpi: 栅格化分辨率
+        page_range: 页面选择表达式，默认全部页面
+        compression: 图片压缩方式: jpeg（彩色/灰度，有损）、g4（CCITT G4，黑白二值，适合文字扫描件）、
+            flate（无损）
+        quality: JPEG质量 (1-95)
+        threshold: g4 二值化阈值 (0-255)，灰度不低于该值的像素为白色
+        max_pixels: 单页最大像素数
+        log_callback: 日志回调函数
+        pool: 文档池
+        password: 加密文档的密码
+        event_callback: 结构化进度事件回调，参见 pdf_to_images
+
+    Returns:
+        输出PDF路径
+    """
+    if compression not in PDF_COMPRESSIONS:
+        raise ValueError(f"不支持的PDF图片压缩方式: {compression}")
+    
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            print(message)
+    
+    _check_source(pdf_path)
+    document = os.fspath(pdf_path) if isinstance(pdf_path, (str, os.PathLike)) else "document"
+    started = time.perf_counter()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    try:
+        with _open_document(pdf_path, pool, password) as pdf_document:
+            page_numbers = select_pages(page_range, len(pdf_document))
+            _emit(event_callback, "document_start", document=document,
+                  page_count=len(pdf_document), selected=len(page_numbers))
+            writer = _StreamingPdfWriter(output_path)
+            try:
+                for page_num in page_numbers:
+                    page_started = time.perf_counter()
+                    page = pdf_document[page_num]
+                    image, data = _encode_pdf_image(page, dpi, compression, quality, threshold, max_pixels)
+                    # 页面尺寸沿用原页面（已包含旋转），图片铺满页面
+                    writer.add_page(page.rect.width, page.rect.height, image, data)
+                    _emit(event_callback, "page", document=document, page=page_num + 1, status="ok",
+                          output=output_path, bytes=len(data), dpi=dpi,
+                          seconds=round(time.perf_counter() - page_started, 4))
+                    log(f"已写入: 第 {page_num + 1} 页 ({len(data) / 1024:.0f} KB)")
+                writer.close()
+            except BaseException:
+                writer.abort()
+                raise
+    except Exception as e:
+        _emit(event_callback, "document_error", document=document,
+              error={"type": type(e).__name__, "message": str(e)},
+              seconds=round(time.perf_counter() - started, 4))
+        raise RuntimeError(f"PDF栅格化失败: {str(e)}")
+    
+    _emit(event_callback, "document_end", document=document, status="ok", pages_ok=len(page_numbers),
+          pages_failed=0, bytes=os.path.getsize(output_path), seconds=round(time.perf_counter() - started, 4))
+    log(f"已保存: {output_path}")
+    return output_path
+
+
+# 性能分析：主进程直接记录，工作进程通过继承的环境变量发现分析会话，在进程退出时写出各自的结果
+PROFILE_ENV = "PDF2IMAGES_PROFILE"
+PROFILE_MODES = ("cprofile", "sample")
+_profile_session = None
+_process_profiler = None
+
+
+class _StackSampler:
+    """采样分析器：后台线程定期记录目标线程的Python调用栈"""
+    
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.counts = {}
+        self.active = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        while True:
+            self.active.wait()
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                key = tuple(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            time.sleep(self.interval)
+    
+    def start(self):
+        self.active.set()
+    
+    def stop(self):
+        self.active.clear()
+    
+    def to_dict(self, name: str) -> dict:
+        return {"name": name, "interval": self.interval,
+                "stacks": [[list(frame) for frame in stack] + [count] for stack, count in self.counts.items()]}
+
+
+class _ProcessProfiler:
+    """单个进程的分析器，多次 start()/stop() 的结果累计，save() 写入文件"""
+    
+    def __init__(self, mode: str, interval: float, path: str):
+        self.mode = mode
+        self.path = path
+        if mode == "cprofile":
+            import cProfile
+            self.profile = cProfile.Profile()
+        else:
+            self.sampler = _StackSampler(interval)
+    
+    def start(self):
+        if self.mode == "cprofile":
+            self.profile.enable()
+        else:
+            self.sampler.start()
+    
+    def stop(self):
+        if self.mode == "cprofile":
+            self.profile.disable()
+        else:
+            self.sampler.stop()
+    
+    def save(self):
+        if self.mode == "cprofile":
+            self.profile.dump_stats(self.path)
+        else:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.sampler.to_dict(f"worker {os.getpid()}"), f)
+
+
+def _save_worker_profile(profiler: _ProcessProfiler):
+    """工作进程退出时写出分析结果；会话已结束（目录已删除）时丢弃"""
+    try:
+        if os.path.isdir(os.path.dirname(profiler.path)):
+            profiler.save()
+    except OSError:
+        pass
+
+
+def _worker_profiler() -> Optional[_ProcessProfiler]:
+    """
+    工作进程中返回本进程的分析器；未开启分析、位于发起分析的进程或分析会话已结束时返回 None
+
+    环境变量在进程启动时继承，常驻的工作进程（如 ConversionQueue）在会话结束后仍保留旧的设置，
+    因此以会话目录是否存在判断会话是否仍在进行。
+    """
+    global _process_profiler, _profile_session
+    config = os.environ.get(PROFILE_ENV)
+    if not config:
+        return None
+    config = json.loads(config)
+    if config["pid"] == os.getpid() or not os.path.isdir(config["dir"]):
+        return None
+    if _profile_session is not None:
+        # fork 启动的进程继承了发起进程仍在运行的分析器，先停用
+        if _profile_session.profiler.mode == "cprofile":
+            _profile_session.profiler.profile.disable()
+        _profile_session = None
+    extension = "pstats" if config["mode"] == "cprofile" else "json"
+    path = os.path.join(config["dir"], f"worker-{os.getpid()}.{extension}")
+    if _process_profiler is None or _process_profiler.path != path:
+        _process_profiler = _ProcessProfiler(config["mode"], config["interval"], path)
+        # 工作进程正常退出时 multiprocessing 会执行已注册的 Finalize
+        from multiprocessing import util
+        util.Finalize(_process_profiler, _save_worker_profile, args=(_process_profiler,), exitpriority=10)
+    return _process_profiler
+
+
+class ProfileSession:
+    """
+    一次性能分析的结果，由 profile_conversion 创建
+
+    Attributes:
+        pages: 分析期间的 page 事件（含每页耗时）
+        summary: 退出上下文后生成的摘要（最耗时的函数和页面）
+    """
+    
+    def __init__(self, output_path: str, mode: str, interval: float, top: int):
+        self.output_path = output_path
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        self.pages = []
+        self.summary = None
+        self.profiler = None
+    
+    def slowest_pages(self) -> List[dict]:
+        pages = [page for page in self.pages if "seconds" in page]
+        pages.sort(key=lambda page: page["seconds"], reverse=True)
+        return [{"document": page["document"], "page": page["page"], "status": page["status"],
+                 "seconds": page["seconds"]} for page in pages[:self.top]]
+    
+    def _merge_cprofile(self, main_path, worker_paths):
+        import pstats
+        
+        stats = pstats.Stats(main_path)
+        for path in worker_paths:
+            stats.add(path)
+        stats.dump_stats(self.output_path)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        return [{"function": name, "file": filename, "line": line, "seconds": round(timings[2], 4),
+                 "cumulative": round(timings[3], 4), "calls": timings[1]}
+                for (filename, line, name), timings in functions[:self.top]]
+    
+    def _merge_samples(self, profiles):
+        """合并各进程的采样结果为 speedscope 格式，每个进程一个 profile"""
+        frames = []
+        frame_index = {}
+        exclusive = {}
+        output_profiles = []
+        for profile in profiles:
+            samples, weights = [], []
+            for entry in profile["stacks"]:
+                *stack, count = entry
+                indices = []
+                for frame in stack:
+                    key = tuple(frame)
+                    if key not in frame_index:
+                        frame_index[key] = len(frames)
+                        frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                    indices.append(frame_index[key])
+                samples.append(indices)
+                weights.append(round(count * profile["interval"], 6))
+                leaf = tuple(stack[-1])
+                exclusive[leaf] = exclusive.get(leaf, 0.0) + count * profile["interval"]
+            output_profiles.append({
+                "type": "sampled", "name": profile["name"], "unit": "seconds",
+                "startValue": 0, "endValue": round(sum(weights), 6), "samples": samples, "weights": weights,
+            })
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": "pdf2images",
+                "exporter": "pdf2images",
+                "shared": {"frames": frames},
+                "profiles": output_profiles,
+            }, f)
+        functions = sorted(exclusive.items(), key=lambda item: item[1], reverse=True)
+        return [{"function": name, "file": filename, "line": line, "seconds": round(seconds, 4)}
+                for (name, filename, line), seconds in functions[:self.top]]
+
+
+@contextmanager
+def profile_conversion(
+    output_path: str,
+    mode: str = "cprofile",
+    interval: float = 0.005,
+    top: int = 10
+):
+    """
+    记录上下文中所有转换的性能分析，包括并行和隔离转换的工作进程
+
+    工作进程在退出时写出结果，因此 ConversionQueue 等常驻进程池需在上下文内启动并关闭；
+    会话结束后仍在运行的工作进程不再记录。
+
+    cprofile 模式合并各进程的结果保存为 pstats 文件（可用 snakeviz 等工具查看）；
+    sample 模式按 interval 秒采样调用栈，保存为 speedscope 格式（https://www.speedscope.app）。
+    退出后 session.summary 包含按自身耗时排序的函数和最慢的页面。
+
+    用法:
+        with profile_conversion("run.pstats") as session:
+            pdf_to_images("document.pdf", "./output/", workers=4)
+        print(session.summary["slowest_pages"])
+
+    Args:
+        output_path: 分析结果文件
+        mode: cprofile 或 sample
+        interval: 采样间隔（秒），仅 sample 模式
+        top: 摘要中列出的函数和页面数量
+    """
+    import shutil
+    import tempfile
+    
+    global _profile_session
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"不支持的分析方式: {mode}")
+    if _profile_session is not None:
+        raise RuntimeError("已有正在进行的性能分析")
+    
+    session = ProfileSession(output_path, mode, interval, top)
+    worker_dir = tempfile.mkdtemp(prefix="pdf2images-profile-")
+    previous = os.environ.get(PROFILE_ENV)
+    os.environ[PROFILE_ENV] = json.dumps({"mode": mode, "interval": interval, "dir": worker_dir,
+                                          "pid": os.getpid()})
+    main_path = os.path.join(worker_dir, "main.pstats" if mode == "cprofile" else "main.json")
+    profiler = session.profiler = _ProcessProfiler(mode, interval, main_path)
+    _profile_session = session
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield session
+    finally:
+        profiler.stop()
+        profiler.save()
+        _profile_session = None
+        if previous is None:
+            os.environ.pop(PROFILE_ENV, None)
+        else:
+            os.environ[PROFILE_ENV] = previous
+        
+        worker_files = sorted(
+            os.path.join(worker_dir, name) for name in os.listdir(worker_dir) if name.startswith("worker-")
+        )
+        if mode == "cprofile":
+            functions = session._merge_cprofile(main_path, worker_files)
+        else:
+            profiles = []
+            for path in [main_path] + worker_files:
+                with open(path, "r", encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            profiles[0]["name"] = f"main {os.getpid()}"
+            functions = session._merge_samples(profiles)
+        shutil.rmtree(worker_dir, ignore_errors=True)
+        
+        session.summary = {
+            "output": output_path,
+            "mode": mode,
+            "seconds": round(time.perf_counter() - started, 4),
+            "processes": 1 + len(worker_files),
+            "pages": len(session.pages),
+            "top_functions": functions,
+            "slowest_pages": session.slowest_pages(),
+        }
+
+
 def quality_to_dpi(quality):
-    """将清晰度挡位转换为DPI值"""
+    """将清晰度挡位转换为DPI值（"自动"挡位返回其DPI上限）"""
     quality_map = {
         "一般": 150,
         "清晰": 200, 
         "高清": 300,
-        "打印": 600
+        "打印": 600,
+        "自动": 600
     }
     return quality_map.get(quality, 200)
 
@@ -183,47 +2510,204 @@ def main():
     parser.add_argument("pdf_paths", nargs='+', help="PDF文件路径（支持多个文件）")
     parser.add_argument("-o", "--output", help="输出目录")
     parser.add_argument("-f", "--format", default="PNG", choices=["PNG", "JPEG", "TIFF"], help="输出图片格式")
-    parser.add_argument("-q", "--quality", default="清晰", choices=["一般", "清晰", "高清", "打印"], help="图片清晰度")
+    parser.add_argument("--to-pdf", action="store_true", help="栅格化为只含图片的PDF（文件名_raster.pdf），逐页写入，不生成中间图片")
+    parser.add_argument("--pdf-compression", choices=PDF_COMPRESSIONS, default="jpeg",
+                        help="--to-pdf 的图片压缩: jpeg / g4 (CCITT G4黑白二值) / flate (无损) (默认: jpeg)")
+    parser.add_argument("--pdf-quality", type=int, default=85, help="--to-pdf 使用jpeg压缩时的质量 (默认: 85)")
+    parser.add_argument("--spec", action="append", help="输出规格，可重复指定: 格式[@DPI][:参数=值,...]，如 PNG@300、JPEG@150:quality=85。"
+                        "每个规格输出到独立子目录，每页每个DPI只渲染一次")
+    parser.add_argument("-q", "--quality", default="清晰", choices=["一般", "清晰", "高清", "打印", "自动"], help="图片清晰度（自动: 按页面内容选择DPI，最高600）")
+    parser.add_argument("--auto-dpi", action="store_true", help="按页面内容自动降低DPI，以清晰度或自定义DPI为上限")
     parser.add_argument("-d", "--dpi", type=int, help="自定义DPI值（会覆盖清晰度设置）")
-    parser.add_argument("--pages", help="页面范围，格式: start-end 或 start (例: 1-5 或 3)，仅适用于单文件")
+    parser.add_argument("--width", type=int, help="目标宽度（像素），按页面尺寸缩放（会覆盖DPI设置）")
+    parser.add_argument("--height", type=int, help="目标高度（像素），与--width同时指定时等比缩放至不超过该尺寸")
+    parser.add_argument("--max-pixels", type=int, help="单页最大像素数（宽×高），超出时缩小渲染")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="并行进程数，0为CPU核心数 (默认: 1，串行)")
+    parser.add_argument("--memory-budget", type=int, help="并行转换内存预算（MB），默认为可用内存的一半")
+    parser.add_argument("--dedup", choices=PageDeduplicator.MODES, help="重复页面只渲染一次，其余以硬链接/符号链接/清单引用输出")
+    parser.add_argument("--skip-blank", action="store_true", help="跳过空白页（按页面内容和低分辨率探测渲染判断）")
+    parser.add_argument("--ink-threshold", type=float, default=0.002, help="空白页判定的墨迹像素比例阈值 (默认: 0.002)")
+    parser.add_argument("--trim", nargs="?", type=int, const=0, metavar="MARGIN", help="自动裁剪白边，可指定保留的边距像素")
+    parser.add_argument("--trim-tolerance", type=int, default=10, help="裁边时背景颜色容差 (默认: 10)")
+    parser.add_argument("--pad-aspect", help="按宽高比补白边，格式: W:H (例: 4:3)")
+    parser.add_argument("--resize", help="缩放到指定尺寸，格式: WxH、Wx 或 xH (例: 800x600、800x)")
+    parser.add_argument("--resize-filter", default="lanczos", choices=PostProcess.FILTERS, help="缩放滤镜 (默认: lanczos)")
+    parser.add_argument("--text", choices=["json", "jsonl"], help="同时导出文字、单词坐标和链接 (json: 每页一个文件, jsonl: 每个文档一个文件)")
+    parser.add_argument("--pages", help="页面选择，逗号分隔 (例: 1,3,5-9,-2,odd)，多文件时分别应用于每个文件")
+    parser.add_argument("--shard", help="只转换属于该分片的页面，格式: i/N (i从0开始)，按 文件路径+页码 的稳定哈希分片")
+    parser.add_argument("--password", default=os.environ.get("PDF_PASSWORD"), help="加密PDF的密码 (默认读取环境变量 PDF_PASSWORD)")
+    parser.add_argument("--page-timeout", type=float, help="单页转换超时（秒），超时页面记为失败并继续，页面在独立进程中渲染")
+    parser.add_argument("--doc-timeout", type=float, help="单个文档的转换超时（秒），超时文档记为失败并继续下一个")
+    parser.add_argument("--quarantine", help="把无法处理的文档（加密、损坏、超时）写入该JSON文件")
+    parser.add_argument("--profile", help="记录性能分析（含所有工作进程）并保存到该文件: cprofile 模式为 pstats，sample 模式为 speedscope JSON")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default="cprofile", help="性能分析方式 (默认: cprofile)")
+    parser.add_argument("--progress", choices=["jsonl"], help="输出JSON-lines进度事件流（文档开始/结束、每页结果、耗时、输出字节数、错误）")
+    parser.add_argument("--progress-fd", type=int, default=1, help="进度事件写入的文件描述符 (默认: 1，即标准输出)")
+    parser.add_argument("--report", choices=["json"], help="转换结束后在标准输出打印JSON批处理报告；"
+                        "进度事件也输出到标准输出时，报告作为最后一行 {\"event\": \"report\", ...} 事件")
+    
+    args = parser.parse_args(_join_page_arguments(sys.argv[1:]))
     
-    args = parser.parse_args()
+    # 机器可读输出占用标准输出时，文字提示改为输出到标准错误
+    machine_stdout = args.report or (args.progress and args.progress_fd == 1)
+    text_out = sys.stderr if machine_stdout else sys.stdout
     
-    # 多文件时不支持页面范围
-    if len(args.pdf_paths) > 1 and args.pages:
-        print("警告: 多文件模式不支持页面范围选择，将转换所有页面")
-        args.pages = None
+    def say(*values, **kwargs):
+        print(*values, file=text_out, **kwargs)
     
     # 确定DPI值
     if args.dpi:
         dpi = args.dpi
-        print(f"使用自定义DPI: {dpi}")
+        say(f"使用自定义DPI: {dpi}")
     else:
         dpi = quality_to_dpi(args.quality)
-        print(f"使用清晰度: {args.quality} ({dpi} DPI)")
+        say(f"使用清晰度: {args.quality} ({dpi} DPI)")
+    
+    auto_dpi = args.auto_dpi or args.quality == "自动"
+    if auto_dpi and not (args.width or args.height):
+        say(f"按页面内容自动选择DPI (上限 {dpi} DPI)")
+    
+    for name, value in (("--width", args.width), ("--height", args.height), ("--max-pixels", args.max_pixels)):
+        if value is not None and value <= 0:
+            say(f"错误: {name} 必须为正整数")
+            return 1
+    if args.width or args.height:
+        say(f"使用目标尺寸: 宽 {args.width or '自动'} × 高 {args.height or '自动'} 像素")
     
     page_range = None
-    if args.pages and len(args.pdf_paths) == 1:
+    if args.pages:
         try:
-            if "-" in args.pages:
-                start, end = map(int, args.pages.split("-"))
-                page_range = (start, end)
-            else:
-                page_num = int(args.pages)
-                page_range = (page_num, page_num)
-        except ValueError:
-            print("错误: 页面范围格式不正确，应为 'start-end' 或 'start'")
+            parse_page_spec(args.pages)
+        except ValueError as e:
+            say(f"错误: 页面选择格式不正确，{str(e)}")
+            return 1
+        page_range = args.pages
+    
+    postprocess = None
+    if args.trim is not None or args.pad_aspect or args.resize:
+        try:
+            aspect = None
+            if args.pad_aspect:
+                aspect_w, aspect_h = map(float, args.pad_aspect.split(":"))
+                aspect = aspect_w / aspect_h
+            resize = None
+            if args.resize:
+                resize_w, resize_h = args.resize.lower().split("x")
+                resize = (int(resize_w) if resize_w else None, int(resize_h) if resize_h else None)
+                if not any(resize):
+                    raise ValueError
+        except (ValueError, ZeroDivisionError):
+            say("错误: 后处理参数格式不正确，--pad-aspect 应为 'W:H'，--resize 应为 'WxH'")
+            return 1
+        postprocess = PostProcess(
+            trim=args.trim is not None,
+            trim_tolerance=args.trim_tolerance,
+            trim_margin=args.trim or 0,
+            aspect=aspect,
+            resize=resize,
+            resize_filter=args.resize_filter
+        )
+    
+    outputs = None
+    if args.spec:
+        try:
+            outputs = [parse_output_spec(spec) for spec in args.spec]
+        except ValueError as e:
+            say(f"错误: {str(e)}")
+            return 1
+        if args.dedup:
+            say("错误: --spec 不能与 --dedup 同时使用")
+            return 1
+        say("输出规格: " + ", ".join(f"{spec.output_format}@{spec.dpi or dpi}" for spec in outputs))
+    if args.dedup and (args.page_timeout or args.doc_timeout):
+        say("错误: --dedup 不能与 --page-timeout / --doc-timeout 同时使用")
+        return 1
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            say(f"错误: {str(e)}")
+            return 1
+        say(f"分片: {shard[0]}/{shard[1]}")
+    
+    progress_stream = None
+    if args.progress:
+        try:
+            progress_stream = sys.stdout if args.progress_fd == 1 else os.fdopen(args.progress_fd, "w")
+        except OSError as e:
+            say(f"错误: 无法打开进度输出 fd {args.progress_fd}: {str(e)}")
             return 1
     
+    def write_progress(event):
+        progress_stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        progress_stream.flush()
+    
+    report = BatchReport(forward=write_progress if progress_stream else None)
+    
+    # 性能分析覆盖整个转换过程，结束后输出摘要
+    profiling = None
+    if args.profile:
+        profiling = profile_conversion(args.profile, args.profile_mode)
+        profile_session = profiling.__enter__()
+    
+    # 单文件与多文件模式共用的渲染参数
+    render_options = dict(
+        width=args.width,
+        height=args.height,
+        max_pixels=args.max_pixels,
+        auto_dpi=auto_dpi,
+        workers=args.workers,
+        memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+        dedup=PageDeduplicator(args.dedup) if args.dedup else None,
+        skip_blank=args.skip_blank,
+        ink_threshold=args.ink_threshold,
+        skipped=[],
+        postprocess=postprocess,
+        text_export=args.text,
+        event_callback=report,
+        shard=shard,
+        password=args.password,
+        page_timeout=args.page_timeout,
+        document_timeout=args.doc_timeout,
+        quarantine=[],
+        outputs=outputs
+    )
+    
     try:
-        if len(args.pdf_paths) == 1:
+        if args.to_pdf:
+            # 栅格化为只含图片的PDF，每个文件输出一个PDF
+            output_files = []
+            for pdf_path in args.pdf_paths:
+                target = os.path.join(args.output or os.path.dirname(pdf_path), f"{Path(pdf_path).stem}_raster.pdf")
+                try:
+                    output_files.append(pdf_to_raster_pdf(
+                        pdf_path,
+                        target,
+                        dpi,
+                        page_range,
+                        compression=args.pdf_compression,
+                        quality=args.pdf_quality,
+                        max_pixels=args.max_pixels,
+                        log_callback=say,
+                        password=args.password,
+                        event_callback=report
+                    ))
+                except (FileNotFoundError, RuntimeError) as e:
+                    if len(args.pdf_paths) == 1:
+                        raise
+                    say(f"转换失败 {os.path.basename(pdf_path)}: {str(e)}")
+        elif len(args.pdf_paths) == 1:
             # 单文件模式
             output_files = pdf_to_images(
                 args.pdf_paths[0],
                 args.output,
                 args.format,
                 dpi,
-                page_range
+                page_range,
+                say,
+                **render_options
             )
         else:
             # 多文件模式
@@ -231,26 +2715,86 @@ def main():
                 # 如果没有指定输出目录，使用第一个文件的目录
                 args.output = os.path.dirname(args.pdf_paths[0])
             
-            print(f"开始批量转换 {len(args.pdf_paths)} 个PDF文件...")
+            say(f"开始批量转换 {len(args.pdf_paths)} 个PDF文件...")
             output_files = multi_pdf_to_images(
                 args.pdf_paths,
                 args.output,
                 args.format,
-                dpi
+                dpi,
+                say,
+                page_range=page_range,
+                **render_options
+            )
+        
+        say(f"\n转换完成! 共生成 {len(output_files)} 个{'PDF' if args.to_pdf else '图片'}文件")
+        if len(args.pdf_paths) > 1 and not args.to_pdf:
+            say(f"各文件已分别保存到独立文件夹中")
+        
+        skipped = render_options["skipped"]
+        if skipped:
+            say(f"跳过 {len(skipped)} 个空白页: " + ", ".join(f"{name} 第{page}页" for name, page in skipped))
+        
+        dedup = render_options["dedup"]
+        if dedup:
+            dedup_report = dedup.report()
+            say(
+                f"去重: {dedup_report['unique']} 个唯一页面，跳过 {dedup_report['duplicates']} 个重复页面"
+                f"（节省约 {dedup_report['saved_pixels'] / 1e6:.1f} 百万像素的渲染）"
             )
+            if dedup.mode == "manifest":
+                manifest_dir = args.output or os.path.dirname(args.pdf_paths[0])
+                manifest_path = os.path.join(manifest_dir, "dedup_manifest.json")
+                dedup.write_manifest(manifest_path)
+                say(f"去重清单: {manifest_path}")
         
-        print(f"\n转换完成! 共生成 {len(output_files)} 个图片文件")
-        if len(args.pdf_paths) > 1:
-            print(f"各文件已分别保存到独立文件夹中")
-        return 0
+        exit_code = 0
+        if report.failed:
+            # 部分文档或页面转换失败
+            say("警告: 部分文件或页面转换失败")
+            exit_code = 2
         
     except (FileNotFoundError, RuntimeError) as e:
-        print(f"错误: {str(e)}")
-        return 1
+        say(f"错误: {str(e)}")
+        exit_code = 1
     except Exception as e:
-        print(f"未知错误: {str(e)}")
-        return 1
+        say(f"未知错误: {str(e)}")
+        exit_code = 1
+    
+    profile_summary = None
+    if profiling is not None:
+        profiling.__exit__(None, None, None)
+        profile_summary = profile_session.summary
+        say(f"\n性能分析已保存: {args.profile} ({profile_summary['processes']} 个进程)")
+        say("自身耗时最多的函数:")
+        for function in profile_summary["top_functions"]:
+            say(f"  {function['seconds']:8.3f}s  {function['function']}  {function['file']}:{function['line']}")
+        if profile_summary["slowest_pages"]:
+            say("最慢的页面:")
+            for page in profile_summary["slowest_pages"]:
+                say(f"  {page['seconds']:8.3f}s  {page['document']} 第 {page['page']} 页")
+    
+    quarantine = render_options["quarantine"]
+    if quarantine:
+        say(f"隔离 {len(quarantine)} 个文档:")
+        for entry in quarantine:
+            say(f"  {entry['document']} ({entry['reason']}): {entry['error']}")
+    if args.quarantine:
+        with open(args.quarantine, "w", encoding="utf-8") as f:
+            json.dump(quarantine, f, ensure_ascii=False, indent=2)
+    
+    if args.report:
+        result = dict(report.to_dict(), exit_code=exit_code, quarantine=quarantine)
+        if profile_summary is not None:
+            result["profile"] = profile_summary
+        if progress_stream is sys.stdout:
+            # 进度事件流同在标准输出，报告作为最后一个事件写成一行，保持 JSON-lines 格式
+            write_progress({"event": "report", **result})
+        else:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+    return exit_code
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，多进程转换需要
+    multiprocessing.freeze_support()
     exit(main())
\ No newline at end of file
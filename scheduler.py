@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+转换任务调度 - 带优先级和租户公平性的页面级任务队列
+
+每个提交的文档被拆分为单页任务，调度器在每一页完成后重新选择下一页：
+先按优先级，同一优先级内在租户之间按已服务页数轮转，同一租户内在各作业之间轮转。
+因此大文档的批量转换不会阻塞其他用户的单页预览，高优先级作业在下一页边界即可抢占。
+
+用法:
+    with ConversionQueue(workers=4) as queue:
+        batch = queue.submit("big.pdf", "out/", tenant="alice")
+        preview = queue.submit("small.pdf", "out/", tenant="bob", priority=PRIORITY_INTERACTIVE,
+                               page_range="1", dpi=72)
+        preview.wait()
+        print(queue.metrics())
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from main import _document_pool, _record_profile_pages, open_pdf, pdf_to_images, select_pages
+
+
+PRIORITY_BATCH = 0
+PRIORITY_INTERACTIVE = 10
+
+# 单页任务无法跨页汇总，不支持去重和按文档汇总的 jsonl 文字层
+UNSUPPORTED_OPTIONS = ("dedup", "workers", "pool", "skipped", "quarantine", "shard", "log_callback", "event_callback")
+
+
+def _run_page_task(pdf_path, output_dir, page, options):
+    """工作进程：转换单页，复用进程内的文档池，返回该页的事件"""
+    events = []
+    pdf_to_images(
+        pdf_path,
+        output_dir,
+        page_range=str(page),
+        log_callback=lambda message: None,
+        pool=_document_pool,
+        event_callback=events.append,
+        **options
+    )
+    return [event for event in events if event["event"] == "page"]
+
+
+class Job:
+    """
+    已提交的转换作业
+
+    通过 wait() 等待完成并取得输出文件，cancel() 取消尚未开始的页面。
+    """
+
+    def __init__(self, job_id, pdf_path, output_dir, tenant, priority, pages, options, event_callback):
+        self.id = job_id
+        self.pdf_path = pdf_path
+        self.output_dir = output_dir
+        self.tenant = tenant
+        self.priority = priority
+        self.pages = pages
+        self.options = options
+        self.event_callback = event_callback
+        self.pending = deque(pages)
+        self.dispatched = 0
+        self.results: Dict[int, dict] = {}
+        self.errors: Dict[int, str] = {}
+        self.cancelled = False
+        self.submitted = time.monotonic()
+        self.first_page_seconds = None
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def outputs(self) -> List[str]:
+        """已完成页面的输出文件，按页码排序"""
+        return [self.results[page]["output"] for page in sorted(self.results) if self.results[page].get("output")]
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        等待作业完成
+
+        Raises:
+            TimeoutError: 超时仍未完成
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"作业 {self.id} 未在 {timeout} 秒内完成")
+        return self.outputs
+
+
+class ConversionQueue:
+    """
+    页面级转换调度器
+
+    Args:
+        workers: 工作进程数，默认为CPU核心数
+        tenant_weights: 租户权重，权重为2的租户获得的页面份额是权重1的两倍
+        history: 计算等待时间分位数时保留的最近页面数
+    """
+
+    def __init__(self, workers: Optional[int] = None, tenant_weights: Optional[Dict[str, float]] = None,
+                 history: int = 1000):
+        self.workers = workers or os.cpu_count() or 1
+        self.tenant_weights = dict(tenant_weights or {})
+        self._executor = self._new_executor()
+        self._lock = threading.Condition()
+        self._jobs: Dict[int, Job] = {}
+        self._served: Dict[str, float] = {}
+        self._ids = itertools.count(1)
+        self._in_flight = 0
+        self._closed = False
+        self._wait_times = deque(maxlen=history)
+        self._completed_pages = 0
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="conversion-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(
+        self,
+        pdf_path: str,
+        output_dir: Optional[str] = None,
+        tenant: str = "default",
+        priority: int = PRIORITY_BATCH,
+        page_range: Optional[str] = None,
+        event_callback: Optional[callable] = None,
+        **options
+    ) -> Job:
+        """
+        提交转换作业，立即返回
+
+        Args:
+            pdf_path: PDF文件路径
+            output_dir: 输出目录
+            tenant: 租户标识，同一优先级内各租户公平分享工作进程
+            priority: 优先级，数值越大越先处理（PRIORITY_INTERACTIVE / PRIORITY_BATCH）
+            page_range: 页面选择表达式
+            event_callback: 接收每页的 page 事件（附带 job 和 tenant 字段），在调度线程中调用
+            **options: 传递给 pdf_to_images 的其他转换参数
+
+        Raises:
+            ValueError: 使用了单页任务不支持的参数
+            RuntimeError: 队列已关闭
+        """
+        unsupported = [name for name in UNSUPPORTED_OPTIONS if name in options]
+        if options.get("text_export") == "jsonl":
+            unsupported.append("text_export='jsonl'")
+        if unsupported:
+            raise ValueError(f"调度队列不支持的参数: {', '.join(unsupported)}")
+
+        pdf_document = open_pdf(pdf_path, options.get("password"))
+        try:
+            pages = [n + 1 for n in select_pages(page_range, len(pdf_document))]
+        finally:
+            pdf_document.close()
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("调度队列已关闭")
+            job = Job(next(self._ids), pdf_path, output_dir, tenant, priority, pages, options, event_callback)
+            if not pages:
+                job.finished = time.monotonic()
+                job._done.set()
+                return job
+            if not any(other.tenant == tenant and other.pending for other in self._jobs.values()):
+                # 新进入的租户从当前最小服务量开始，不会因之前空闲而连续独占
+                active = [self._served[other.tenant] for other in self._jobs.values()
+                          if other.pending and other.tenant in self._served]
+                self._served[tenant] = max(self._served.get(tenant, 0.0), min(active, default=0.0))
+            self._jobs[job.id] = job
+            self._lock.notify_all()
+        return job
+
+    def cancel(self, job: Job):
+        """取消作业中尚未开始的页面，已在转换的页面会完成"""
+        with self._lock:
+            job.cancelled = True
+            job.pending.clear()
+            self._finish_if_done(job)
+
+    def close(self, wait: bool = True):
+        """停止接受新作业；wait为True时等待已提交的作业全部完成"""
+        with self._lock:
+            self._closed = True
+            if not wait:
+                for job in list(self._jobs.values()):
+                    job.cancelled = True
+                    job.pending.clear()
+                    self._finish_if_done(job)
+            self._lock.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _new_executor(self):
+        # 调度线程已启动，fork 可能继承被占用的锁，工作进程使用 spawn 启动
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _next_page(self):
+        """选择下一页：最高优先级 → 服务量最少的租户 → 该租户中已分派最少的作业"""
+        runnable = [job for job in self._jobs.values() if job.pending]
+        if not runnable:
+            return None
+        top = max(job.priority for job in runnable)
+        runnable = [job for job in runnable if job.priority == top]
+        tenant = min({job.tenant for job in runnable}, key=lambda name: (self._served.get(name, 0.0), name))
+        job = min((job for job in runnable if job.tenant == tenant), key=lambda job: (job.dispatched, job.id))
+        job.dispatched += 1
+        self._served[tenant] = self._served.get(tenant, 0.0) + 1.0 / self.tenant_weights.get(tenant, 1.0)
+        return job, job.pending.popleft()
+
+    def _dispatch_loop(self):
+        with self._lock:
+            while True:
+                while self._in_flight < self.workers:
+                    task = self._next_page()
+                    if task is None:
+                        break
+                    job, page = task
+                    try:
+                        future = self._executor.submit(_run_page_task, job.pdf_path, job.output_dir, page, job.options)
+                    except BrokenProcessPool:
+                        # 工作进程异常退出（如 MuPDF 崩溃）后进程池不可再用：在途页面已由各自的
+                        # future 记为失败，换用新的进程池并重新分派这一页
+                        job.pending.appendleft(page)
+                        job.dispatched -= 1
+                        self._executor.shutdown(wait=False)
+                        self._executor = self._new_executor()
+                        continue
+                    self._in_flight += 1
+                    self._wait_times.append(time.monotonic() - job.submitted)
+                    future.add_done_callback(lambda future, job=job, page=page: self._page_done(job, page, future))
+                if self._closed and not self._in_flight and not any(job.pending for job in self._jobs.values()):
+                    return
+                self._lock.wait()
+
+    def _page_done(self, job: Job, page: int, future):
+        try:
+            events = future.result()
+        except Exception as e:
+            message = f"工作进程异常退出: {e}" if isinstance(e, BrokenProcessPool) else str(e)
+            events = [{"event": "page", "document": os.fspath(job.pdf_path), "page": page, "status": "error",
+                       "error": {"type": type(e).__name__, "message": message}}]
+        _record_profile_pages(events)
+        with self._lock:
+            self._in_flight -= 1
+            self._completed_pages += 1
+            for event in events:
+                if event["status"] == "error":
+                    job.errors[page] = event["error"]["message"]
+                else:
+                    job.results[page] = event
+            if job.first_page_seconds is None:
+                job.first_page_seconds = time.monotonic() - job.submitted
+            self._finish_if_done(job)
+            self._lock.notify_all()
+        if job.event_callback:
+            for event in events:
+                job.event_callback(dict(event, job=job.id, tenant=job.tenant))
+
+    def _finish_if_done(self, job: Job):
+        finished = len(job.results) + len(job.errors)
+        if not job.pending and (job.cancelled and finished >= job.dispatched or finished >= len(job.pages)):
+            if job.finished is None:
+                job.finished = time.monotonic()
+                job._done.set()
+            self._jobs.pop(job.id, None)
+
+    def metrics(self) -> dict:
+        """
+        队列指标
+
+        Returns:
+            队列深度（待处理页数，按优先级和租户分组）、活跃作业数、在途页数、
+            已完成页数，以及页面从提交到开始转换的等待时间（秒）的 p50 / p95 / 最大值
+        """
+        with self._lock:
+            by_priority = {}
+            by_tenant = {}
+            for job in self._jobs.values():
+                if job.pending:
+                    by_priority[job.priority] = by_priority.get(job.priority, 0) + len(job.pending)
+                    by_tenant[job.tenant] = by_tenant.get(job.tenant, 0) + len(job.pending)
+            waits = sorted(self._wait_times)
+        return {
+            "queue_depth": sum(by_priority.values()),
+            "queue_depth_by_priority": by_priority,
+            "queue_depth_by_tenant": by_tenant,
+            "jobs_active": len(self._jobs),
+            "pages_in_flight": self._in_flight,
+            "pages_completed": self._completed_pages,
+            "wait_seconds": {
+                "p50": round(waits[len(waits) // 2], 4) if waits else None,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4) if waits else None,
+                "max": round(waits[-1], 4) if waits else None,
+            },
+        }
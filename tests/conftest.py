@@ -0,0 +1,84 @@
+"""
+测试夹具：在本地生成测试用PDF，无需外部样本文件
+"""
+import io
+import os
+
+import pytest
+from PIL import Image
+
+
+def _build_sample(path):
+    """
+    生成覆盖主要渲染情况的测试PDF：文字、矢量图形、嵌入图片、旋转页面、横向页面、
+    空白页和内容重复的页面
+    """
+    import pymupdf
+
+    def draw_page(index):
+        page = document.new_page()
+        page.insert_text((72, 72), f"Page {index + 1}", fontsize=24)
+        page.insert_text((72, 120), "The quick brown fox jumps over the lazy dog. " * 2, fontsize=9)
+        page.draw_rect(pymupdf.Rect(72, 160, 72 + 40 * (index + 1), 260), color=(0.8, 0, 0), fill=(0, 0, 0.6))
+        page.draw_circle((300, 420), 30 + index * 5, color=(0, 0.5, 0), width=3)
+
+    document = pymupdf.open()
+    for index in range(6):
+        draw_page(index)
+
+    # 嵌入图片的页面（模拟扫描件）
+    gradient = Image.linear_gradient("L").resize((300, 200)).convert("RGB")
+    buffer = io.BytesIO()
+    gradient.save(buffer, "PNG")
+    page = document.new_page()
+    page.insert_image(pymupdf.Rect(72, 72, 372, 272), stream=buffer.getvalue())
+
+    # 旋转页面和横向页面
+    page = document.new_page(width=400, height=600)
+    page.insert_text((40, 60), "Rotated page", fontsize=20)
+    page.set_rotation(90)
+    page = document.new_page(width=842, height=595)
+    page.insert_text((72, 72), "Landscape page", fontsize=20)
+
+    # 空白页
+    document.new_page()
+
+    # 与第1页内容相同的页面
+    draw_page(0)
+
+    document.save(path)
+    document.close()
+
+
+@pytest.fixture(scope="session")
+def sample_pdf(tmp_path_factory):
+    path = os.path.join(tmp_path_factory.mktemp("fixtures"), "sample.pdf")
+    _build_sample(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def long_pdf(tmp_path_factory):
+    """性能测试用的多页文档"""
+    import pymupdf
+
+    path = os.path.join(tmp_path_factory.mktemp("fixtures"), "long.pdf")
+    document = pymupdf.open()
+    for index in range(24):
+        page = document.new_page()
+        for line in range(30):
+            page.insert_text((56, 60 + line * 24), f"{index + 1}-{line + 1} " + "lorem ipsum dolor sit amet " * 3,
+                             fontsize=9)
+        page.draw_rect(pymupdf.Rect(56, 760, 540, 800), color=(0, 0, 0), fill=(0.9, 0.9, 0.2))
+    document.save(path)
+    document.close()
+    return path
+
+
+def read_pixels(paths, root):
+    """读取图片，返回 {相对路径: (尺寸, 模式, 像素数据)}"""
+    images = {}
+    for path in paths:
+        with Image.open(path) as image:
+            images[os.path.relpath(path, root)] = (image.size, image.mode, image.tobytes())
+    return images
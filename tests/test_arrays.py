@@ -0,0 +1,21 @@
+"""
+数组输出测试：堆叠为单个数组或写入 .npy 映射文件，页面尺寸不一致时在渲染前报错
+"""
+import pytest
+
+from main import pdf_to_arrays
+
+
+def test_stacked_arrays(sample_pdf, tmp_path):
+    np = pytest.importorskip("numpy")
+
+    path = tmp_path / "pages.npy"
+    # 横向和旋转页面的尺寸不同：渲染前报错，不留下写了一半的文件
+    with pytest.raises(RuntimeError, match="页面尺寸不一致"):
+        pdf_to_arrays(sample_pdf, width=64, height=64, mmap_path=str(path))
+    assert not path.exists()
+
+    batch = pdf_to_arrays(sample_pdf, dpi=72, page_range="1-6", mmap_path=str(path))
+    assert batch.shape == (6, 842, 595, 3)
+    for array, expected in zip(np.load(path), pdf_to_arrays(sample_pdf, dpi=72, page_range="1-6")):
+        assert np.array_equal(array, expected)
@@ -0,0 +1,72 @@
+"""
+跨文档页面去重测试：页面指纹区分渲染结果不同的页面，深层引用链不会超出递归深度，
+重新输出时不会写穿去重生成的链接
+"""
+import pymupdf
+
+from main import page_fingerprint
+
+
+def _same_content_pages(count):
+    document = pymupdf.open()
+    for _ in range(count):
+        page = document.new_page(width=612, height=792)
+        page.insert_text((72, 100), "Same content stream", fontsize=20)
+    return document
+
+
+def test_cropbox_origin_changes_fingerprint():
+    document = _same_content_pages(3)
+    document[1].set_cropbox(pymupdf.Rect(0, 0, 532, 712))
+    document[2].set_cropbox(pymupdf.Rect(40, 40, 572, 752))
+    memo = {}
+    fingerprints = [page_fingerprint(document, page, memo) for page in document]
+    # 裁剪后的尺寸相同（page.rect 相同），原点不同
+    assert document[1].rect == document[2].rect
+    assert len(set(fingerprints)) == 3
+
+
+def test_linked_page_chain_does_not_recurse(tmp_path):
+    from main import PageDeduplicator, pdf_to_images
+
+    # 每页有指向下一页的链接，注释引用链贯穿整个文档
+    document = _same_content_pages(1500)
+    for page in document:
+        if page.number + 1 < len(document):
+            page.insert_link({"kind": pymupdf.LINK_GOTO, "from": pymupdf.Rect(72, 700, 200, 720),
+                              "page": page.number + 1})
+    path = str(tmp_path / "chain.pdf")
+    document.save(path)
+
+    dedup = PageDeduplicator("manifest")
+    pdf_to_images(path, str(tmp_path / "out"), dpi=10, page_range="1-3", log_callback=lambda message: None,
+                  dedup=dedup)
+    # 链接目标不同但渲染结果相同的页面视为重复
+    assert dedup.report()["duplicates"] == 2
+
+
+def test_rerun_does_not_write_through_links(tmp_path):
+    import os
+
+    from main import PageDeduplicator, pdf_to_images
+
+    path = str(tmp_path / "doc.pdf")
+    _same_content_pages(2).save(path)
+    output_dir = str(tmp_path / "out")
+    quiet = lambda message: None
+    dedup = PageDeduplicator("hardlink")
+    first, second = pdf_to_images(path, output_dir, dpi=36, log_callback=quiet, dedup=dedup)
+    assert os.path.samefile(first, second)
+    with open(second, "rb") as f:
+        duplicate = f.read()
+
+    # 第1页内容改变后重新输出到同一目录，第2页的链接文件不受影响
+    document = pymupdf.open(path)
+    document[0].insert_text((72, 300), "Changed", fontsize=20)
+    document.save(path, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+    document.close()
+    pdf_to_images(path, output_dir, dpi=36, log_callback=quiet, page_range="1")
+    with open(second, "rb") as f:
+        assert f.read() == duplicate
+    with open(first, "rb") as f:
+        assert f.read() != duplicate
@@ -0,0 +1,37 @@
+"""
+分布式队列测试：重试次数用尽的任务转为失败，不会被无限领取；失败任务记录实际的转换错误
+"""
+from distributed import PageQueue
+
+
+def test_expired_lease_respects_max_attempts(tmp_path):
+    queue = PageQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    try:
+        queue.enqueue("a.pdf", [1, 2], str(tmp_path / "out"), {})
+        # 第1页的工作端每次都卡死：租约过期且已用完尝试次数
+        queue.connection.execute(
+            "UPDATE tasks SET status = 'leased', owner = 'stuck', attempts = 2, lease_expires = 0 WHERE page = 1"
+        )
+        assert queue.counts()["failed"] == 1
+
+        leased = queue.lease("worker", count=5)
+        assert [task["page"] for task in leased] == [2]
+        assert queue.lease("worker", count=5) == []
+        assert [(failure["page"], failure["attempts"]) for failure in queue.failures()] == [(1, 2)]
+    finally:
+        queue.close()
+
+
+def test_failed_page_records_conversion_error(sample_pdf, tmp_path):
+    from distributed import enqueue_documents, run_worker
+
+    queue = PageQueue(str(tmp_path / "queue.db"), max_attempts=1)
+    try:
+        enqueue_documents(queue, [sample_pdf], str(tmp_path / "out"), page_range="1", log_callback=print, dpi=72)
+        # 输出文件路径被目录占用，保存失败
+        (tmp_path / "out" / "sample" / "sample_page_001.png").mkdir(parents=True)
+        assert run_worker(queue, log_callback=print) == {"done": 0, "failed": 1}
+        error = queue.failures()[0]["error"]
+        assert error.startswith("IsADirectoryError: ")
+    finally:
+        queue.close()
@@ -0,0 +1,203 @@
+"""
+输出等价性测试：串行、并行、隔离进程、内存输入、文档池、调度队列、渐进式和分布式队列等
+转换路径必须生成相同的文件名和逐像素相同的图片
+"""
+import multiprocessing
+import os
+
+import pytest
+from PIL import Image
+
+from conftest import read_pixels
+from main import (
+    DocumentPool,
+    OutputSpec,
+    PageDeduplicator,
+    map_pdf,
+    pdf_to_images,
+    pdf_to_raster_pdf,
+    progressive_pdf_to_images,
+)
+
+DPI = 72
+
+
+def quiet(message):
+    pass
+
+
+def convert_serial(pdf_path, output_dir):
+    return pdf_to_images(pdf_path, output_dir, dpi=DPI, log_callback=quiet)
+
+
+def convert_parallel(pdf_path, output_dir):
+    return pdf_to_images(pdf_path, output_dir, dpi=DPI, log_callback=quiet, workers=2)
+
+
+def convert_isolated(pdf_path, output_dir):
+    return pdf_to_images(pdf_path, output_dir, dpi=DPI, log_callback=quiet, workers=2, page_timeout=120)
+
+
+def convert_memory(pdf_path, output_dir):
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    return pdf_to_images(data, output_dir, dpi=DPI, log_callback=quiet, name="sample")
+
+
+def convert_mmap(pdf_path, output_dir):
+    return pdf_to_images(map_pdf(pdf_path), output_dir, dpi=DPI, log_callback=quiet, name="sample")
+
+
+def convert_mmap_parallel(pdf_path, output_dir):
+    return pdf_to_images(map_pdf(pdf_path), output_dir, dpi=DPI, log_callback=quiet, name="sample", workers=2)
+
+
+def convert_cached(pdf_path, output_dir):
+    pool = DocumentPool()
+    pdf_to_images(pdf_path, output_dir, dpi=DPI, log_callback=quiet, pool=pool, page_range="1-3")
+    outputs = pdf_to_images(pdf_path, output_dir, dpi=DPI, log_callback=quiet, pool=pool)
+    assert pool.stats()["hits"] >= 1
+    pool.close_all()
+    return outputs
+
+
+def convert_spec(pdf_path, output_dir):
+    # 多输出规格：PNG输出在子目录中，与同时输出的JPEG共用一次渲染
+    outputs = pdf_to_images(pdf_path, output_dir, dpi=DPI, log_callback=quiet,
+                            outputs=[OutputSpec("PNG", name="png"), OutputSpec("JPEG", name="jpeg")])
+    return [path for path in outputs if os.sep + "png" + os.sep in path]
+
+
+def convert_scheduler(pdf_path, output_dir):
+    from scheduler import ConversionQueue
+
+    with ConversionQueue(workers=2) as queue:
+        return queue.submit(pdf_path, output_dir, dpi=DPI).wait(timeout=120)
+
+
+def convert_progressive(pdf_path, output_dir):
+    conversion = progressive_pdf_to_images(pdf_path, output_dir, dpi=DPI, visible="2-3", log_callback=quiet,
+                                           pool=DocumentPool())
+    return conversion.wait(timeout=120)
+
+
+def convert_distributed(pdf_path, output_dir):
+    from distributed import PageQueue, enqueue_documents, run_worker
+
+    queue = PageQueue(output_dir + ".db")
+    try:
+        # 每个文档输出到 输出目录/文件名 子目录
+        enqueue_documents(queue, [pdf_path], os.path.dirname(output_dir), log_callback=quiet, dpi=DPI)
+        run_worker(queue, batch=3, log_callback=quiet)
+        assert queue.counts()["done"] == 11
+    finally:
+        queue.close()
+    return sorted(os.path.join(output_dir, name) for name in os.listdir(output_dir))
+
+
+PATHS = {
+    "parallel": convert_parallel,
+    "isolated": convert_isolated,
+    "memory": convert_memory,
+    "mmap": convert_mmap,
+    "mmap_parallel": convert_mmap_parallel,
+    "cached": convert_cached,
+    "spec": convert_spec,
+    "scheduler": convert_scheduler,
+    "progressive": convert_progressive,
+    "distributed": convert_distributed,
+}
+
+
+@pytest.fixture(scope="module")
+def reference(sample_pdf, tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("reference"))
+    outputs = convert_serial(sample_pdf, output_dir)
+    assert len(outputs) == 11
+    return read_pixels(outputs, output_dir)
+
+
+@pytest.mark.parametrize("name", sorted(PATHS))
+def test_paths_match_serial(name, sample_pdf, reference, tmp_path):
+    output_dir = str(tmp_path / "sample")
+    outputs = PATHS[name](sample_pdf, output_dir)
+    root = os.path.dirname(outputs[0])
+    images = read_pixels(outputs, root)
+    assert sorted(images) == sorted(reference)
+    for filename, expected in reference.items():
+        assert images[filename] == expected, f"{name}: {filename} 像素不一致"
+
+
+def test_arrays_match_images(sample_pdf, reference):
+    np = pytest.importorskip("numpy")
+    from main import pdf_to_arrays
+
+    arrays = pdf_to_arrays(sample_pdf, dpi=DPI)
+    for array, filename in zip(arrays, sorted(reference)):
+        size, mode, pixels = reference[filename]
+        assert array.shape == (size[1], size[0], 3)
+        assert np.asarray(array).tobytes() == pixels
+
+
+def test_dedup_links_identical_pixels(sample_pdf, reference, tmp_path):
+    dedup = PageDeduplicator("hardlink")
+    outputs = pdf_to_images(sample_pdf, str(tmp_path), dpi=DPI, log_callback=quiet, dedup=dedup)
+    assert dedup.report()["duplicates"] == 1
+    assert read_pixels(outputs, str(tmp_path)) == reference
+
+
+@pytest.mark.parametrize("compression, tolerance", [("flate", 1.0), ("jpeg", 4.0), ("g4", 40.0)])
+def test_raster_pdf_is_perceptually_close(sample_pdf, reference, tmp_path, compression, tolerance):
+    import pymupdf
+
+    output = pdf_to_raster_pdf(sample_pdf, str(tmp_path / "flat.pdf"), dpi=DPI, compression=compression,
+                               log_callback=quiet)
+    with pymupdf.open(output) as document:
+        assert len(document) == 11
+        for page, filename in zip(document, sorted(reference)):
+            size, mode, pixels = reference[filename]
+            pix = page.get_pixmap(dpi=DPI, alpha=False)
+            assert (pix.width, pix.height) == size
+            diff = sum(abs(a - b) for a, b in zip(pix.samples, pixels)) / len(pixels)
+            assert diff <= tolerance, f"{compression}: {filename} 平均像素差 {diff:.2f}"
+
+
+def test_blank_page_skipped_without_renaming(sample_pdf, reference, tmp_path):
+    skipped = []
+    outputs = pdf_to_images(sample_pdf, str(tmp_path), dpi=DPI, log_callback=quiet, skip_blank=True,
+                            skipped=skipped)
+    assert skipped == [("sample", 10)]
+    images = read_pixels(outputs, str(tmp_path))
+    assert sorted(images) == sorted(name for name in reference if name != "sample_page_010.png")
+    assert all(images[name] == reference[name] for name in images)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="需要 fork 启动的工作进程")
+def test_blank_probe_isolated_with_timeout(sample_pdf, reference, tmp_path, monkeypatch):
+    import time
+
+    import main
+
+    probe = main.is_blank_page
+
+    def hanging_probe(page, ink_threshold):
+        if page.number == 2:
+            time.sleep(60)
+        return probe(page, ink_threshold)
+
+    # fork 启动的隔离进程继承替换后的检测函数：卡住的检测只让该页超时
+    monkeypatch.setattr(main, "is_blank_page", hanging_probe)
+    skipped = []
+    outputs = pdf_to_images(sample_pdf, str(tmp_path), dpi=DPI, log_callback=quiet, skip_blank=True,
+                            skipped=skipped, page_timeout=3, workers=2)
+    assert skipped == [("sample", 10)]
+    images = read_pixels(outputs, str(tmp_path))
+    assert sorted(images) == sorted(name for name in reference if name not in ("sample_page_003.png",
+                                                                               "sample_page_010.png"))
+
+
+def test_metadata_dpi(sample_pdf, tmp_path):
+    outputs = pdf_to_images(sample_pdf, str(tmp_path), dpi=DPI, log_callback=quiet, page_range="1")
+    with Image.open(outputs[0]) as image:
+        assert round(image.info["dpi"][0]) == DPI
+
@@ -0,0 +1,29 @@
+"""
+内存输入测试：bytes / bytearray / mmap 输入直接引用，不复制文档数据；
+映射文件与工作进程共享
+"""
+import os
+from multiprocessing import get_context
+
+from main import _worker_source, map_pdf, open_pdf
+
+
+def test_bytearray_referenced_not_copied(sample_pdf):
+    with open(sample_pdf, "rb") as f:
+        buffer = bytearray(f.read())
+    document = open_pdf(buffer)
+    try:
+        assert len(document) == 11
+        # PyMuPDF 对 bytearray 会复制为 bytes，包装为 memoryview 后直接引用原缓冲区
+        assert isinstance(document.stream, memoryview)
+        assert document.stream.obj is buffer
+    finally:
+        document.close()
+
+
+def test_mapped_source_shared_with_workers(sample_pdf):
+    mapped = map_pdf(sample_pdf)
+    # fork 进程继承同一映射；spawn 进程按路径自行映射，都不复制文档内容
+    assert _worker_source(mapped, get_context("fork")) is mapped
+    assert _worker_source(mapped, get_context("spawn")) == os.path.abspath(sample_pdf)
+    assert isinstance(_worker_source(memoryview(b"%PDF"), get_context("spawn")), bytes)
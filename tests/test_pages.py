@@ -0,0 +1,61 @@
+"""
+页面选择测试：表达式解析、倒数页码、元组范围截断和命令行参数
+"""
+import os
+
+import pytest
+
+from main import _join_page_arguments, parse_page_spec, pdf_to_images, select_pages
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("3", [("range", 3, 3)]),
+    ("2-5", [("range", 2, 5)]),
+    ("8-", [("range", 8, None)]),
+    ("-1", [("range", -1, -1)]),
+    ("-3--1", [("range", -3, -1)]),
+    ("-3-", [("range", -3, None)]),
+    (" 1, odd ,EVEN", [("range", 1, 1), ("odd",), ("even",)]),
+    ("all", [("range", 1, None)]),
+    ("*", [("range", 1, None)]),
+])
+def test_parse_page_spec(spec, expected):
+    assert parse_page_spec(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["", " , ", "0", "2-0", "a-3", "1-2-3", "1..3"])
+def test_parse_page_spec_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_page_spec(spec)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("1,3,5-9,-2", [0, 2, 4, 5, 6, 7, 8]),
+    ("-3--1", [7, 8, 9]),
+    ("odd", [0, 2, 4, 6, 8]),
+    ("even,1", [0, 1, 3, 5, 7, 9]),
+    ("8-", [7, 8, 9]),
+    ("5-2", []),
+    ("12-20", []),
+    ("-20-2", [0, 1]),
+    ("3,3,2-3", [1, 2]),
+])
+def test_select_pages(spec, expected):
+    assert select_pages(spec, 10) == expected
+
+
+def test_negative_page_arguments_on_command_line():
+    argv = ["a.pdf", "--pages", "-3--1", "-o", "out"]
+    assert _join_page_arguments(argv) == ["a.pdf", "--pages=-3--1", "-o", "out"]
+    assert _join_page_arguments(["--pages", "-2,odd"]) == ["--pages=-2,odd"]
+    # 非页码的值保持原样，由 argparse 报告缺少参数
+    assert _join_page_arguments(["--pages", "-o", "out"]) == ["--pages", "-o", "out"]
+
+
+def test_tuple_page_range_clamped(sample_pdf, tmp_path):
+    # 元组页码范围保持原有的截断行为
+    assert select_pages((0, 3), 11) == [0, 1, 2]
+    assert select_pages((-2, 2), 11) == [0, 1]
+    assert select_pages((10, 99), 11) == [9, 10]
+    outputs = pdf_to_images(sample_pdf, str(tmp_path), dpi=72, log_callback=print, page_range=(0, 2))
+    assert [os.path.basename(path) for path in outputs] == ["sample_page_001.png", "sample_page_002.png"]
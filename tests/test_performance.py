@@ -0,0 +1,77 @@
+"""
+吞吐量回归测试：页/秒低于 tests/perf_baseline.json 中的基线超过容差时失败
+
+默认的 pytest 运行不包含这些测试，需显式指定：
+    uv run pytest -m perf
+基线与机器相关，在新环境中先更新基线：
+    PDF2IMAGES_UPDATE_BASELINE=1 uv run pytest -m perf
+调整容差（默认取基线文件中的 tolerance，0.3 表示允许比基线慢30%）：
+    PDF2IMAGES_PERF_TOLERANCE=0.5 uv run pytest -m perf
+"""
+import json
+import os
+import time
+
+import pytest
+
+from main import pdf_to_images, pdf_to_raster_pdf
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+DPI = 100
+RUNS = 3
+
+
+def quiet(message):
+    pass
+
+
+CASES = {
+    "serial_png": lambda pdf, out: pdf_to_images(pdf, out, dpi=DPI, log_callback=quiet),
+    "serial_jpeg": lambda pdf, out: pdf_to_images(pdf, out, "JPEG", dpi=DPI, log_callback=quiet),
+    "parallel_png": lambda pdf, out: pdf_to_images(pdf, out, dpi=DPI, log_callback=quiet, workers=2),
+    "raster_pdf": lambda pdf, out: [pdf_to_raster_pdf(pdf, os.path.join(out, "flat.pdf"), dpi=DPI,
+                                                      log_callback=quiet)],
+}
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {"tolerance": 0.3, "cases": {}}
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def measure(case, pdf_path, tmp_path, pages):
+    """运行 RUNS 次，返回最快一次的页/秒"""
+    best = 0.0
+    for run in range(RUNS):
+        output_dir = str(tmp_path / f"{case}_{run}")
+        start = time.perf_counter()
+        CASES[case](pdf_path, output_dir)
+        best = max(best, pages / (time.perf_counter() - start))
+    return best
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_throughput_against_baseline(case, long_pdf, tmp_path):
+    pages = 24
+    rate = measure(case, long_pdf, tmp_path, pages)
+    baseline = load_baseline()
+
+    if os.environ.get("PDF2IMAGES_UPDATE_BASELINE"):
+        baseline["cases"][case] = {"pages_per_second": round(rate, 2)}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return
+
+    expected = baseline["cases"].get(case)
+    if expected is None:
+        pytest.skip(f"基线中没有 {case}，使用 PDF2IMAGES_UPDATE_BASELINE=1 生成")
+    tolerance = float(os.environ.get("PDF2IMAGES_PERF_TOLERANCE", baseline["tolerance"]))
+    floor = expected["pages_per_second"] * (1 - tolerance)
+    assert rate >= floor, (
+        f"{case}: {rate:.2f} 页/秒，低于基线 {expected['pages_per_second']:.2f} 页/秒 的 "
+        f"{(1 - tolerance) * 100:.0f}% ({floor:.2f} 页/秒)"
+    )
@@ -0,0 +1,37 @@
+"""
+文档池测试：内存输入的内容哈希按对象缓存，可变输入每次重新计算
+"""
+import hashlib
+
+import main
+from main import DocumentPool
+
+
+def test_memory_digest_cached_per_object(sample_pdf, monkeypatch):
+    with open(sample_pdf, "rb") as f:
+        data = f.read()
+    calls = []
+    blake2b = hashlib.blake2b
+
+    def counting_blake2b(*args, **kwargs):
+        calls.append(1)
+        return blake2b(*args, **kwargs)
+
+    monkeypatch.setattr(main.hashlib, "blake2b", counting_blake2b)
+
+    pool = DocumentPool()
+    for _ in range(3):
+        with pool.document(data) as document:
+            assert len(document) == 11
+    assert len(calls) == 1
+    assert pool.stats()["hits"] == 2
+
+    # bytearray 可能被修改，每次借出都重新计算哈希
+    buffer = bytearray(data)
+    for _ in range(2):
+        with pool.document(buffer):
+            pass
+    assert len(calls) == 3
+
+    pool.close_all()
+    assert not pool._digests
@@ -0,0 +1,56 @@
+"""
+性能分析测试：工作进程的分析结果被合并，摘要列出最慢的页面；会话结束后常驻工作进程照常转换
+"""
+import json
+import pstats
+
+from main import pdf_to_images, profile_conversion
+
+
+def quiet(message):
+    pass
+
+
+def test_cprofile_merges_worker_processes(sample_pdf, tmp_path):
+    output = str(tmp_path / "run.pstats")
+    with profile_conversion(output, top=3) as session:
+        pdf_to_images(sample_pdf, str(tmp_path / "out"), dpi=72, log_callback=quiet, workers=2)
+
+    summary = session.summary
+    assert summary["processes"] >= 2
+    assert summary["pages"] == 11
+    assert len(summary["slowest_pages"]) == 3
+    assert summary["slowest_pages"][0]["seconds"] >= summary["slowest_pages"][-1]["seconds"]
+    functions = {name for _, _, name in pstats.Stats(output).stats}
+    assert any("_convert_page" in name for name in functions)
+
+
+def test_sample_profile_is_speedscope(sample_pdf, tmp_path):
+    output = str(tmp_path / "run.speedscope.json")
+    with profile_conversion(output, mode="sample", interval=0.001) as session:
+        pdf_to_images(sample_pdf, str(tmp_path / "out"), dpi=72, log_callback=quiet, page_range="1-3")
+
+    with open(output, encoding="utf-8") as f:
+        profile = json.load(f)
+    assert profile["profiles"][0]["type"] == "sampled"
+    assert profile["shared"]["frames"]
+    assert session.summary["top_functions"]
+
+
+def test_scheduler_workers_profiled_and_usable_after_session(sample_pdf, tmp_path):
+    from scheduler import ConversionQueue
+
+    output = str(tmp_path / "queue.pstats")
+    with profile_conversion(output) as session:
+        with ConversionQueue(workers=1) as queue:
+            queue.submit(sample_pdf, str(tmp_path / "out"), page_range="1-2", dpi=72).wait(timeout=60)
+    assert session.summary["pages"] == 2
+    assert session.summary["processes"] == 2
+
+    # 会话内启动的常驻工作进程在会话结束后继续转换，不再记录分析结果
+    with ConversionQueue(workers=1) as queue:
+        with profile_conversion(str(tmp_path / "short.pstats")):
+            queue.submit(sample_pdf, str(tmp_path / "out"), page_range="1", dpi=72).wait(timeout=60)
+        job = queue.submit(sample_pdf, str(tmp_path / "out"), page_range="2-3", dpi=72)
+        assert len(job.wait(timeout=60)) == 2
+        assert not job.errors
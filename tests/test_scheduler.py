@@ -0,0 +1,112 @@
+"""
+调度队列测试：优先级抢占、租户按加权服务量轮转、队列指标，
+工作进程崩溃只影响在途页面，之后提交的作业照常完成
+"""
+import os
+
+import pytest
+
+from scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, ConversionQueue
+
+
+class CrashingPostProcess:
+    """模拟渲染时工作进程崩溃（如 MuPDF 段错误）"""
+
+    def apply(self, image):
+        os._exit(1)
+
+
+def test_worker_crash_does_not_stop_dispatch(sample_pdf, tmp_path):
+    with ConversionQueue(workers=1) as queue:
+        crashed = queue.submit(sample_pdf, str(tmp_path / "crash"), page_range="1", dpi=72,
+                               postprocess=CrashingPostProcess())
+        assert crashed.wait(timeout=60) == []
+        assert "工作进程异常退出" in crashed.errors[1]
+
+        job = queue.submit(sample_pdf, str(tmp_path / "ok"), page_range="1-2", dpi=72)
+        assert len(job.wait(timeout=60)) == 2
+        assert not job.errors
+        assert queue._dispatcher.is_alive()
+
+
+class StubExecutor:
+    def shutdown(self, wait=True):
+        pass
+
+
+@pytest.fixture
+def paused_queue(monkeypatch):
+    """不分派任务的队列：直接调用 _next_page 检查调度顺序"""
+    monkeypatch.setattr(ConversionQueue, "_new_executor", lambda self: StubExecutor())
+    monkeypatch.setattr(ConversionQueue, "_dispatch_loop", lambda self: None)
+
+    def make(**kwargs):
+        return ConversionQueue(workers=1, **kwargs)
+    return make
+
+
+def drain(queue):
+    order = []
+    with queue._lock:
+        while True:
+            task = queue._next_page()
+            if task is None:
+                return order
+            job, page = task
+            order.append((job.tenant, job.id, page))
+
+
+def test_priority_and_tenant_interleaving(paused_queue, sample_pdf):
+    queue = paused_queue()
+    a = queue.submit(sample_pdf, tenant="alice", page_range="1-4")
+    b = queue.submit(sample_pdf, tenant="bob", page_range="1-2")
+    c = queue.submit(sample_pdf, tenant="alice", page_range="1-2")
+    p = queue.submit(sample_pdf, tenant="carol", priority=PRIORITY_INTERACTIVE, page_range="1")
+
+    metrics = queue.metrics()
+    assert metrics["queue_depth"] == 9
+    assert metrics["queue_depth_by_priority"] == {PRIORITY_BATCH: 8, PRIORITY_INTERACTIVE: 1}
+    assert metrics["queue_depth_by_tenant"] == {"alice": 6, "bob": 2, "carol": 1}
+    assert metrics["jobs_active"] == 4
+
+    # 高优先级先行；同优先级内租户轮转，同一租户内各作业轮转
+    assert drain(queue) == [
+        ("carol", p.id, 1),
+        ("alice", a.id, 1), ("bob", b.id, 1), ("alice", c.id, 1), ("bob", b.id, 2),
+        ("alice", a.id, 2), ("alice", c.id, 2), ("alice", a.id, 3), ("alice", a.id, 4),
+    ]
+    queue.close()
+
+
+def test_interactive_job_preempts_at_page_boundary(paused_queue, sample_pdf):
+    queue = paused_queue()
+    batch = queue.submit(sample_pdf, tenant="alice", page_range="1-6")
+    with queue._lock:
+        assert queue._next_page()[0] is batch
+    preview = queue.submit(sample_pdf, tenant="bob", priority=PRIORITY_INTERACTIVE, page_range="2")
+    with queue._lock:
+        assert queue._next_page() == (preview, 2)
+        assert queue._next_page() == (batch, 2)
+    queue.close()
+
+
+def test_tenant_weights(paused_queue, sample_pdf):
+    queue = paused_queue(tenant_weights={"alice": 2})
+    queue.submit(sample_pdf, tenant="alice", page_range="1-6")
+    queue.submit(sample_pdf, tenant="bob", page_range="1-6")
+    tenants = [tenant for tenant, _, _ in drain(queue)[:9]]
+    assert tenants == ["alice", "bob", "alice", "alice", "bob", "alice", "alice", "bob", "alice"]
+    queue.close()
+
+
+def test_metrics_report_wait_times(sample_pdf, tmp_path):
+    with ConversionQueue(workers=1) as queue:
+        jobs = [queue.submit(sample_pdf, str(tmp_path / name), page_range="1-2", dpi=36) for name in "ab"]
+        for job in jobs:
+            job.wait(timeout=60)
+        metrics = queue.metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["pages_completed"] == 4
+    waits = metrics["wait_seconds"]
+    assert 0 <= waits["p50"] <= waits["p95"] <= waits["max"]
+    assert all(job.first_page_seconds is not None for job in jobs)